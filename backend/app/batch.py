@@ -0,0 +1,115 @@
+import os
+import json
+import time
+import asyncio
+from collections import Counter
+from typing import AsyncIterator, List, Optional
+
+from . import routing, limits
+from .agent_logic import process_user_query, route_many
+from .tools.sql_search import SQL_PROMPTS, needs_text_to_sql, prepare_sql, prepare_lookups
+
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 8))
+BATCH_MAX_CONCURRENCY = 64
+# Queries per batched routing call.
+ROUTE_BATCH_SIZE = int(os.environ.get("ROUTE_BATCH_SIZE", 25))
+# Same-intent queries run together so they share warm caches and prepared statements.
+INTENT_ORDER = ("STATS", "SPECIFIC", "DISCOVERY", "GENERAL")
+
+def parse_jsonl(text: str) -> List[dict]:
+    """
+    One query per line: {"query": ..., "id"?, "session_id"?, "location"?}
+    or a bare JSON string. Blank lines are skipped.
+    """
+    items = []
+    for n, line in enumerate(text.splitlines(), 1):
+        if not line.strip(): continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"line {n}: {e}")
+        if isinstance(item, str): item = {"query": item}
+        if not isinstance(item, dict) or not str(item.get("query") or "").strip():
+            raise ValueError(f"line {n}: expected a query")
+        items.append(item)
+    return items
+
+async def route_all(queries: List[str]) -> List[str]:
+    """
+    Local tiers first; everything they can't place goes to the LLM in
+    chunks of ROUTE_BATCH_SIZE instead of one call per query.
+    """
+    intents: List[Optional[str]] = []
+    for q in queries:
+        intent, _, tier = routing.classify_local(q)
+        if intent: routing.record(tier)
+        intents.append(intent)
+    pending = [i for i, intent in enumerate(intents) if intent is None]
+    for start in range(0, len(pending), ROUTE_BATCH_SIZE):
+        chunk = pending[start:start + ROUTE_BATCH_SIZE]
+        for i, intent in zip(chunk, await route_many([queries[i] for i in chunk])):
+            # Unparsed answers stay None and are routed by the graph as usual.
+            if intent:
+                routing.record("batch")
+                intents[i] = intent
+    return intents
+
+async def run_batch(items: List[dict], concurrency: int = BATCH_CONCURRENCY) -> AsyncIterator[dict]:
+    """
+    Routes every query up front, generates the Text-to-SQL and catalog rows
+    the batch needs in a few shared calls, then answers the queries grouped
+    by intent with at most `concurrency` in flight. Yields one result per
+    query as it finishes (not in input order), then a summary line.
+    """
+    start = time.perf_counter()
+    queries = [str(item["query"]) for item in items]
+    intents = await route_all(queries)
+
+    by_kind = {kind: [q for q, intent in zip(queries, intents) if intent == kind and needs_text_to_sql(kind, q)] for kind in SQL_PROMPTS}
+    generated, looked_up = await asyncio.gather(
+        asyncio.gather(*(prepare_sql(kind, qs) for kind, qs in by_kind.items() if qs)),
+        prepare_lookups([q for q, intent in zip(queries, intents) if intent == "SPECIFIC"]),
+    )
+    prepared_s = time.perf_counter() - start
+    print(f"📦 Batch of {len(items)}: routed {sum(1 for i in intents if i)}, "
+          f"{sum(generated)} SQL generated, {looked_up} catalog rows in {prepared_s:.2f}s")
+
+    order = sorted(range(len(items)), key=lambda i: INTENT_ORDER.index(intents[i]) if intents[i] else len(INTENT_ORDER))
+    queue = asyncio.Queue()
+    for i in order: queue.put_nowait(i)
+    results = asyncio.Queue()
+
+    async def answer(i: int) -> dict:
+        item = items[i]
+        out = {"index": i, "id": item.get("id"), "query": queries[i]}
+        # Lower priority than interactive /chat: waits while they are busy, never shed.
+        await limits.admission.acquire_batch()
+        try:
+            result = await process_user_query(queries[i], str(item.get("session_id") or ""), [], item.get("location"), intents[i])
+            return {**out, **result}
+        except Exception as e:
+            return {**out, "error": str(e)}
+        finally:
+            await limits.admission.release_batch()
+
+    async def worker():
+        while not queue.empty():
+            # Each answer runs in its own context, like a separate request.
+            await results.put(await asyncio.create_task(answer(queue.get_nowait())))
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, BATCH_MAX_CONCURRENCY)))]
+    done = asyncio.gather(*workers)
+    errors = 0
+    try:
+        for _ in items:
+            result = await results.get()
+            errors += "error" in result
+            yield result
+    finally:
+        done.cancel()
+    elapsed = time.perf_counter() - start
+    yield {"summary": {
+        "queries": len(items), "errors": errors, "intents": dict(Counter(i or "ROUTER" for i in intents)),
+        "prepare_s": round(prepared_s, 2), "total_s": round(elapsed, 2),
+        "throughput_qps": round(len(items) / elapsed, 2) if elapsed else None,
+    }}
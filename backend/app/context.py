@@ -0,0 +1,136 @@
+import os
+import re
+from typing import List, Optional
+
+from .tools.suggest_index import normalize
+from . import telemetry
+
+# Token budgets for what node_synthesize sends on top of its fixed instructions.
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", 1200))
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", 250))
+# Most recent turns kept word for word; older ones are folded into the summary.
+HISTORY_KEEP_TURNS = int(os.environ.get("HISTORY_KEEP_TURNS", 2))
+WEB_SENTENCES_PER_SNIPPET = int(os.environ.get("WEB_SENTENCES_PER_SNIPPET", 2))
+
+# In priority order: when the budget runs out, web goes first and the DB last.
+SOURCES = (("sql_data", "🔥 OFFICIAL DB"), ("rag_data", "✨ VIBE MATCHES"), ("web_data", "🌍 WEB RESULTS"))
+
+STOPWORDS = {"best", "good", "great", "place", "places", "food", "mumbai", "restaurant", "restaurants",
+             "with", "where", "what", "which", "that", "this", "from", "have", "near", "some", "about"}
+SENTENCE = re.compile(r"(?<=[.!?])\s+")
+TRAILING_URL = re.compile(r"\s*\((https?://[^)]+)\)\s*$")
+# "• Name (Area) ..." lines from the SQL/RAG tools, and str(dict) rows from run_sql_check.
+LIST_ITEM = re.compile(r"^[•\-]\s*(.+?)\s*\(")
+DICT_NAME = re.compile(r"""['"]name['"]:\s*['"]([^'"]+)['"]""")
+BOLD_NAME = re.compile(r"\*\*([^*]+)\*\*")
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    ~4 characters per token, close enough for Llama on English text.
+    """
+    return (len(text) + 3) // 4 if text else 0
+
+def _restaurant_key(line: str) -> Optional[str]:
+    m = LIST_ITEM.match(line) or DICT_NAME.search(line)
+    return normalize(m.group(1)) if m else None
+
+def _query_terms(query: str) -> set:
+    return {w for w in normalize(query).split() if len(w) > 3 and w not in STOPWORDS}
+
+def trim_web(web: str, query: str, names: set) -> List[str]:
+    """
+    Keeps the sentences of each web snippet that mention a query term or a
+    restaurant from the DB/RAG sections; snippets with none are dropped.
+    """
+    terms = _query_terms(query)
+    out = []
+    for snippet in web.split("\n"):
+        snippet = snippet.strip().lstrip("-").strip()
+        if not snippet: continue
+        url = TRAILING_URL.search(snippet)
+        body = snippet[:url.start()] if url else snippet
+        scored = []
+        for i, sentence in enumerate(SENTENCE.split(body)):
+            text = f" {normalize(sentence)} "
+            score = len(terms & set(text.split())) + 2 * sum(1 for n in names if n and f" {n} " in text)
+            if score: scored.append((score, i, sentence.strip()))
+        if not scored: continue
+        keep = sorted(sorted(scored, reverse=True)[:WEB_SENTENCES_PER_SNIPPET], key=lambda s: s[1])
+        out.append("- " + " ".join(s for _, _, s in keep) + (f" ({url.group(1)})" if url else ""))
+    return out
+
+def raw_context(state: dict) -> str:
+    """
+    The uncompacted context, as node_verifier used to build it.
+    """
+    return "".join(f"{label}:\n{state[key]}\n\n" for key, label in SOURCES if state.get(key))
+
+def compact_context(state: dict, budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """
+    Builds refined_context within a token budget: restaurants already listed
+    by a higher-priority source are dropped, web snippets are cut to the
+    relevant sentences, and lines are admitted DB first, then RAG, then web.
+    """
+    seen = set()
+    sections = []
+    for key, label in SOURCES:
+        text = state.get(key)
+        if not text: continue
+        if key == "web_data":
+            lines = trim_web(text, state.get("query", ""), seen)
+        else:
+            lines = []
+            for line in text.split("\n"):
+                if not line.strip(): continue
+                name = _restaurant_key(line)
+                if name and name in seen: continue
+                if name: seen.add(name)
+                lines.append(line.strip())
+        sections.append((label, lines))
+
+    used, out = 0, []
+    for label, lines in sections:
+        kept = []
+        for line in lines:
+            cost = estimate_tokens(line) + 1
+            if used + cost > budget: break
+            kept.append(line)
+            used += cost
+        if kept:
+            out.append(f"{label}:\n" + "\n".join(kept))
+            used += estimate_tokens(label)
+    return "\n\n".join(out)
+
+def _summarize_turn(turn: dict) -> str:
+    content = str(turn.get("content", ""))
+    if turn.get("role") == "user":
+        return "asked " + SENTENCE.split(content.strip())[0][:120]
+    names = list(dict.fromkeys(BOLD_NAME.findall(content)))[:4]
+    return "suggested " + ", ".join(names) if names else ""
+
+def roll_summary(summary: str, turns: List[dict], budget: int = HISTORY_TOKEN_BUDGET) -> str:
+    """
+    Folds older turns into a one-line extractive summary (what the user asked,
+    which restaurants were suggested). Oldest parts fall off past the budget.
+    """
+    parts = [p for p in summary.split("; ") if p] if summary else []
+    parts += [s for s in map(_summarize_turn, turns) if s]
+    while parts and estimate_tokens("; ".join(parts)) > budget:
+        parts.pop(0)
+    return "; ".join(parts)
+
+def compact_history(history: List[dict], summary: str = "") -> str:
+    recent = history[-HISTORY_KEEP_TURNS:] if HISTORY_KEEP_TURNS else []
+    summary = roll_summary(summary, history[:len(history) - len(recent)])
+    lines = [f"EARLIER: {summary}"] if summary else []
+    for m in recent:
+        content = str(m.get("content", ""))
+        # Keep the most recent turns verbatim, but not unbounded.
+        limit = HISTORY_TOKEN_BUDGET * 4
+        lines.append(f"{m['role'].upper()}: {content[:limit]}{'…' if len(content) > limit else ''}")
+    return "\n".join(lines)
+
+def record_prompt_tokens(before: int, after: int) -> dict:
+    telemetry.inc("munchy_prompt_tokens_total", before, stage="raw")
+    telemetry.inc("munchy_prompt_tokens_total", after, stage="compacted")
+    return {"before": before, "after": after}
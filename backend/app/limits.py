@@ -0,0 +1,221 @@
+import os
+import time
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from . import telemetry
+
+# Requests allowed to run at once, and how many more may wait for a slot before we shed.
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", 32))
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", 64))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", 5))
+# Share of in-flight capacity above which new requests skip web and YouTube enrichment.
+DEGRADE_AT = float(os.environ.get("DEGRADE_AT", 0.75))
+# Batch jobs only start a query while interactive pressure is below this, with at most
+# BATCH_MAX_IN_FLIGHT batch queries running across all jobs.
+BATCH_ADMIT_BELOW = float(os.environ.get("BATCH_ADMIT_BELOW", 0.5))
+BATCH_MAX_IN_FLIGHT = int(os.environ.get("BATCH_MAX_IN_FLIGHT", 16))
+# Longest a call waits for an upstream token before giving up.
+UPSTREAM_WAIT = float(os.environ.get("UPSTREAM_WAIT", 2))
+
+# (requests per second, burst) per upstream; RATE_LIMIT_<NAME>=0 disables a limit.
+DEFAULT_LIMITS = {
+    "groq": (10, 20),
+    "tavily": (5, 10),
+    "duckduckgo": (2, 4),
+    "youtube": (5, 10),
+    "geocoding": (40, 50),
+    "postgres": (200, 400),
+}
+# Enrichment skipped under pressure; the answer then comes from DB data alone.
+ENRICHMENT = ("web", "youtube")
+# Web search falls back across these, so it's only out of budget when all of them are.
+WEB_UPSTREAMS = ("tavily", "duckduckgo")
+
+class RateLimited(Exception):
+    def __init__(self, upstream: str):
+        super().__init__(f"{upstream} rate limit reached")
+        self.upstream = upstream
+
+class Overloaded(Exception):
+    pass
+
+class TokenBucket:
+    """
+    Classic token bucket, safe to use from the event loop and from worker threads.
+    """
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """
+        Takes a token if one is available and returns 0, else returns the seconds until one is.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def available(self) -> bool:
+        with self._lock:
+            return self.tokens + (time.monotonic() - self.updated) * self.rate >= 1
+
+    async def acquire(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while (wait := self._take()) > 0:
+            if time.monotonic() + wait > deadline: return False
+            await asyncio.sleep(wait)
+        return True
+
+    def acquire_sync(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while (wait := self._take()) > 0:
+            if time.monotonic() + wait > deadline: return False
+            time.sleep(wait)
+        return True
+
+def _bucket(name: str, rate: float, burst: float):
+    rate = float(os.environ.get(f"RATE_LIMIT_{name.upper()}", rate))
+    burst = float(os.environ.get(f"RATE_BURST_{name.upper()}", burst))
+    return TokenBucket(rate, max(burst, 1)) if rate > 0 else None
+
+buckets = {name: _bucket(name, *limits) for name, limits in DEFAULT_LIMITS.items()}
+
+@asynccontextmanager
+async def upstream(name: str, timeout: float = UPSTREAM_WAIT):
+    """
+    Waits (up to timeout) for a token for this upstream, else raises RateLimited.
+    """
+    bucket = buckets.get(name)
+    if bucket and not await bucket.acquire(timeout):
+        telemetry.inc("munchy_rate_limited_total", upstream=name)
+        raise RateLimited(name)
+    yield
+
+@contextmanager
+def upstream_sync(name: str, timeout: float = UPSTREAM_WAIT):
+    """
+    upstream() for code already running in a worker thread.
+    """
+    bucket = buckets.get(name)
+    if bucket and not bucket.acquire_sync(timeout):
+        telemetry.inc("munchy_rate_limited_total", upstream=name)
+        raise RateLimited(name)
+    yield
+
+# --- ADMISSION CONTROL ---
+
+_degraded: ContextVar[bool] = ContextVar("degraded", default=False)
+
+class AdmissionController:
+    """
+    Bounded in-flight requests with a bounded wait queue. A request that
+    finds the queue full (or waits too long) is shed with Overloaded.
+    Batch work has its own lower-priority slots, outside the interactive
+    counts, so it never takes queue places or adds to pressure.
+    """
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float,
+                 max_batch: int = BATCH_MAX_IN_FLIGHT, batch_below: float = BATCH_ADMIT_BELOW):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_batch = max_batch
+        self.batch_below = batch_below
+        self.in_flight = 0
+        self.waiting = 0
+        self.batch_in_flight = 0
+        self._cond = None
+        self.stats = {"admitted": 0, "shed": 0, "degraded": 0, "batch_admitted": 0}
+
+    def _condition(self) -> asyncio.Condition:
+        # Created lazily so it binds to the running loop.
+        if self._cond is None: self._cond = asyncio.Condition()
+        return self._cond
+
+    def pressure(self) -> float:
+        return (self.in_flight + self.waiting) / self.max_in_flight
+
+    async def acquire(self):
+        cond = self._condition()
+        async with cond:
+            if self.in_flight >= self.max_in_flight:
+                if self.waiting >= self.max_queue:
+                    self._shed("queue_full")
+                self.waiting += 1
+                try:
+                    await asyncio.wait_for(cond.wait_for(lambda: self.in_flight < self.max_in_flight), self.queue_timeout)
+                except asyncio.TimeoutError:
+                    self._shed("queue_timeout")
+                finally:
+                    self.waiting -= 1
+                    # Pressure may have dropped for waiting batch work.
+                    cond.notify_all()
+            self.in_flight += 1
+            self.stats["admitted"] += 1
+
+    async def release(self):
+        cond = self._condition()
+        async with cond:
+            self.in_flight -= 1
+            # Interactive waiters and batch waiters check different conditions.
+            cond.notify_all()
+
+    async def acquire_batch(self):
+        """
+        Waits, without ever being shed, until interactive pressure is below
+        batch_below and a batch slot is free.
+        """
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(lambda: self.pressure() < self.batch_below and self.batch_in_flight < self.max_batch)
+            self.batch_in_flight += 1
+            self.stats["batch_admitted"] += 1
+
+    async def release_batch(self):
+        cond = self._condition()
+        async with cond:
+            self.batch_in_flight -= 1
+            cond.notify_all()
+
+    def _shed(self, reason: str):
+        self.stats["shed"] += 1
+        telemetry.inc("munchy_shed_total", reason=reason)
+        raise Overloaded(reason)
+
+    def admit_mode(self):
+        """
+        Decides, once per request, whether it runs degraded (no web/YouTube):
+        under pressure, or when every web provider's bucket is empty. An empty
+        YouTube bucket only skips the reviews (youtube_search doesn't queue).
+        """
+        degraded = self.pressure() >= DEGRADE_AT or all(
+            (b := buckets.get(u)) is not None and not b.available() for u in WEB_UPSTREAMS
+        )
+        _degraded.set(degraded)
+        if degraded:
+            self.stats["degraded"] += 1
+            telemetry.inc("munchy_degraded_total")
+        return degraded
+
+    def admission_stats(self):
+        return dict(self.stats, in_flight=self.in_flight, waiting=self.waiting,
+                    max_in_flight=self.max_in_flight, max_queue=self.max_queue, pressure=round(self.pressure(), 3),
+                    batch_in_flight=self.batch_in_flight, max_batch=self.max_batch)
+
+admission = AdmissionController(ADMISSION_MAX_IN_FLIGHT, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT)
+
+def degraded() -> bool:
+    return _degraded.get()
+
+def limit_stats():
+    return {name: {"rate": b.rate, "burst": b.burst, "tokens": round(b.tokens, 1)} if b else None for name, b in buckets.items()}
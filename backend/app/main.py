@@ -1,10 +1,28 @@
-from fastapi import FastAPI, HTTPException
+import os
+import json
+import time
+import asyncio
+
+_import_start = time.perf_counter()
+from fastapi import FastAPI, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Any
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Optional
 
 # Import from the file above
-from .agent_logic import process_user_query, get_suggestions
+from . import agent_logic
+from .agent_logic import process_user_query, stream_user_query, get_suggestions
+from .batch import parse_jsonl, run_batch, BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY
+from .tools import db, geocode, suggest_index, vector_search, web_search, youtube_search
+from .tools.catalog import catalog_stats
+from .tools.web_search import web_cache, provider_stats
+from .tools.youtube_search import youtube_cache
+from . import routing, telemetry, prefetch, limits, warmup
+from .sessions import session_store
+from .response_cache import response_cache
+
+warmup.record_import(time.perf_counter() - _import_start)
 
 app = FastAPI(title="Munchy Mumbai API")
 
@@ -16,6 +34,70 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+async def _load_vectors():
+    await asyncio.to_thread(vector_search.load_index)
+    # Near-duplicate matching in the response cache is opt-in: "pasta in Bandra"
+    # and "pasta in Juhu" embed close together but need different answers.
+    if os.environ.get("RESPONSE_CACHE_SEMANTIC") == "1" and vector_search.get_index():
+        response_cache.embedder = lambda text: vector_search.embed([text])[0].tolist()
+
+async def _purge_sessions():
+    if purged := await asyncio.to_thread(session_store.purge):
+        print(f"🧹 Purged {purged} expired sessions")
+
+async def _build_search_clients():
+    # The first real request shouldn't pay for importing LangChain or YouTube discovery.
+    if os.environ.get("TAVILY_API_KEY"): await asyncio.to_thread(web_search.get_tavily)
+    await asyncio.to_thread(web_search.get_ddg)
+    if key := os.environ.get("YOUTUBE_API_KEY"): await asyncio.to_thread(youtube_search.get_youtube, key)
+
+@app.on_event("startup")
+async def startup():
+    """
+    Starts warm-up and returns, so the port binds at once; /health answers
+    503 "warming" and chat requests wait until it's done.
+    """
+    warmup.start([
+        # The suggestion index feeds the catalog, leaderboards and spatial index, and needs the pool.
+        [("db_pool", db.open_pool), ("catalog", suggest_index.start_index)],
+        [("vector_index", _load_vectors)],
+        [("sessions", _purge_sessions)],
+        [("llm", lambda: asyncio.to_thread(agent_logic.get_llm)), ("graph", lambda: asyncio.to_thread(agent_logic.get_graph))],
+        [("search_clients", _build_search_clients)],
+    ])
+
+@app.on_event("shutdown")
+async def shutdown():
+    await warmup.stop()
+    await suggest_index.stop_index()
+    await db.close_pool()
+
+@telemetry.register_gauges
+def _cache_gauges():
+    gauges = {
+        "munchy_response_cache_hit_rate": response_cache.cache_stats()["hit_rate"],
+        "munchy_web_cache_hit_rate": web_cache.cache_stats()["hit_rate"],
+        "munchy_youtube_cache_hit_rate": youtube_cache.cache_stats()["hit_rate"],
+        "munchy_geocode_cache_hit_rate": geocode.cache_stats()["hit_rate"],
+        "munchy_router_latency_saved_seconds": routing.router_stats()["latency_saved_s"],
+        "munchy_prefetch_hit_rate": prefetch.prefetch_stats()["hit_rate"],
+        "munchy_prefetch_waste_rate": prefetch.prefetch_stats()["waste_rate"],
+        "munchy_sessions_in_memory": session_store.cache_stats()["sessions"],
+        "munchy_sessions_bytes": session_store.cache_stats()["bytes"],
+        "munchy_requests_in_flight": limits.admission.in_flight,
+        "munchy_requests_waiting": limits.admission.waiting,
+        "munchy_batch_in_flight": limits.admission.batch_in_flight,
+        "munchy_admission_pressure": limits.admission.pressure(),
+        "munchy_catalog_rows": catalog_stats()["rows"],
+        "munchy_catalog_bytes": catalog_stats()["bytes"],
+    }
+    for tier, rate in routing.router_stats()["hit_rates"].items():
+        gauges[f"munchy_router_{tier}_hit_rate"] = rate
+    pool = db.pool_metrics()
+    for key in ("pool_size", "pool_available", "requests_waiting", "checkout_avg_ms"):
+        if key in pool: gauges[f"munchy_db_{key}"] = pool[key]
+    return gauges
+
 class ChatMessage(BaseModel):
     role: str
     content: str
@@ -23,22 +105,131 @@ class ChatMessage(BaseModel):
 class QueryRequest(BaseModel):
     query: str
     session_id: str = "default"
+    # Optional: with a session_id the server keeps the history itself.
     chat_history: List[ChatMessage] = []
+    # The user's position ({"lat", "lng"}), for "near me" questions.
+    location: Optional[Dict[str, float]] = None
+
+class SuggestRequest(BaseModel):
+    query: str
+    limit: int = Field(3, ge=1, le=20)
+
+def _overloaded(reason: str):
+    return JSONResponse({"detail": f"Server busy ({reason}), please retry."}, status_code=503,
+                        headers={"Retry-After": str(max(1, round(limits.ADMISSION_QUEUE_TIMEOUT)))})
 
 @app.post("/chat")
 async def chat_endpoint(request: QueryRequest):
     try:
+        await limits.admission.acquire()
+    except limits.Overloaded as e:
+        return _overloaded(str(e))
+    try:
+        await warmup.wait_ready()
         history_dicts = [{"role": m.role, "content": m.content} for m in request.chat_history]
-        result = await process_user_query(request.query, request.session_id, history_dicts)
+        result = await process_user_query(request.query, request.session_id, history_dicts, request.location)
         return result
     except Exception as e:
         print(f"SERVER ERROR: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        await limits.admission.release()
+
+class AdmittedStream(StreamingResponse):
+    """
+    Releases the request's admission slot when the response is over, even if
+    the client disconnected before the body generator ever started.
+    """
+    def __init__(self, content, release, **kwargs):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.release()
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: QueryRequest):
+    """
+    Server-Sent Events version of /chat. The final "done" event carries
+    the same payload /chat returns.
+    """
+    # Admitted before the response starts, so a shed request still gets a plain 503.
+    try:
+        await limits.admission.acquire()
+    except limits.Overloaded as e:
+        return _overloaded(str(e))
+    history_dicts = [{"role": m.role, "content": m.content} for m in request.chat_history]
+    released = False
+
+    async def release():
+        # Called from both the generator and the response; only the first one counts.
+        nonlocal released
+        if released: return
+        released = True
+        await limits.admission.release()
+
+    async def events():
+        try:
+            await warmup.wait_ready()
+            async for name, data in stream_user_query(request.query, request.session_id, history_dicts, request.location):
+                yield f"event: {name}\ndata: {json.dumps(data, default=str)}\n\n"
+        except Exception as e:
+            print(f"SERVER ERROR: {e}")
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+        finally:
+            await release()
+
+    return AdmittedStream(events(), release, media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/chat/batch")
+async def chat_batch_endpoint(request: Request, concurrency: int = Query(BATCH_CONCURRENCY, ge=1, le=BATCH_MAX_CONCURRENCY)):
+    """
+    Bulk /chat for evaluation and cache warming. Body: JSONL, one
+    {"query", "id"?, "session_id"?, "location"?} per line. Streams back
+    JSONL: one /chat result per query as it finishes (with its "index" and
+    "id"), then a {"summary"} line. Queries take lower-priority batch slots,
+    so interactive /chat traffic is never queued or shed behind them.
+    """
+    try:
+        items = parse_jsonl((await request.body()).decode())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await warmup.wait_ready()
+
+    async def lines():
+        async for result in run_batch(items, concurrency):
+            yield json.dumps(result, default=str) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 @app.post("/suggest")
-async def suggest(request: QueryRequest):
-    return get_suggestions(request.query)
+async def suggest(request: SuggestRequest):
+    return await get_suggestions(request.query, request.limit)
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(telemetry.render_prometheus(), media_type="text/plain; version=0.0.4")
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
\ No newline at end of file
+    body = {
+        "status": "ok" if warmup.ready() else "warming",
+        "startup": warmup.warmup_stats(),
+        "db": db.pool_metrics(),
+        "catalog": catalog_stats(),
+        "geocode": geocode.cache_stats(),
+        "router": routing.router_stats(),
+        "response_cache": response_cache.cache_stats(),
+        "web_cache": web_cache.cache_stats(),
+        "web_search": provider_stats(),
+        "youtube_cache": youtube_cache.cache_stats(),
+        "sessions": session_store.cache_stats(),
+        "prefetch": prefetch.prefetch_stats(),
+        "admission": limits.admission.admission_stats(),
+        "limits": limits.limit_stats(),
+    }
+    # Load balancers hold traffic until warm-up has finished.
+    return body if warmup.ready() else JSONResponse(body, status_code=503)
\ No newline at end of file
@@ -0,0 +1,78 @@
+import os
+import asyncio
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Optional
+
+from . import telemetry
+
+# "speculative" starts shared retrievals while the router LLM runs; "off" waits for the route.
+PREFETCH_MODE = os.environ.get("PREFETCH_MODE", "speculative")
+
+# Which branches can use each prefetched tool.
+USED_BY = {
+    "semantic": {"SPECIFIC", "DISCOVERY"},
+    "web": {"SPECIFIC", "DISCOVERY"},
+}
+
+_current: ContextVar[Optional["Prefetch"]] = ContextVar("prefetch", default=None)
+_stats = {"started": 0, "hits": 0, "wasted": 0}
+
+class Prefetch:
+    """
+    Speculative tool calls for one request, keyed by (tool, args).
+    A node that needs a tool claims the running task instead of starting
+    its own; whatever is never claimed is cancelled when the request ends.
+    """
+    def __init__(self):
+        self.tasks: Dict[tuple, asyncio.Task] = {}
+
+    def start(self, name: str, args: tuple, make: Callable[[], Awaitable]):
+        if (name, args) in self.tasks: return
+        self.tasks[(name, args)] = asyncio.create_task(make())
+        _stats["started"] += 1
+        telemetry.inc("munchy_prefetch_total", tool=name, outcome="started")
+
+    def claim(self, name: str, args: tuple) -> Optional[asyncio.Task]:
+        task = self.tasks.pop((name, args), None)
+        if task is not None:
+            _stats["hits"] += 1
+            telemetry.inc("munchy_prefetch_total", tool=name, outcome="hit")
+        return task
+
+    def keep(self, intent: str):
+        """
+        Drops the speculative work the chosen branch can't use.
+        """
+        for key in [k for k in self.tasks if intent not in USED_BY.get(k[0], ())]:
+            self._waste(key)
+
+    def finish(self):
+        for key in list(self.tasks):
+            self._waste(key)
+
+    def _waste(self, key: tuple):
+        task = self.tasks.pop(key)
+        # A finished result still warmed the web/YouTube caches; an unfinished one is cancelled.
+        if not task.done(): task.cancel()
+        _stats["wasted"] += 1
+        telemetry.inc("munchy_prefetch_total", tool=key[0], outcome="wasted")
+
+def begin() -> Optional[Prefetch]:
+    """
+    Called once per request, before the graph runs. Nodes reach the same
+    object through the context they inherit.
+    """
+    prefetch = Prefetch() if PREFETCH_MODE == "speculative" else None
+    _current.set(prefetch)
+    return prefetch
+
+def current() -> Optional[Prefetch]:
+    return _current.get()
+
+def prefetch_stats():
+    started = _stats["started"]
+    return dict(
+        _stats, mode=PREFETCH_MODE,
+        hit_rate=round(_stats["hits"] / started, 3) if started else 0.0,
+        waste_rate=round(_stats["wasted"] / started, 3) if started else 0.0,
+    )
@@ -0,0 +1,115 @@
+import os
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from .tools.suggest_index import normalize
+from . import routing
+
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", 900))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+RESPONSE_CACHE_SIMILARITY = float(os.environ.get("RESPONSE_CACHE_SIMILARITY", 0.92))
+
+FILLER = {"please", "pls", "plz", "the", "a", "an", "me", "tell", "show", "can", "could", "you", "u", "some"}
+# References that only make sense against earlier turns.
+FOLLOW_UP = re.compile(r"\b(it|its|it's|there|that|those|them|this place|same|another|else|more|what about|how about|instead)\b")
+
+def cache_key(query: str) -> str:
+    """
+    Normalized text plus the local router's intent guess, so
+    "Best pasta in Bandra?" and "best pasta in bandra please" share a slot.
+    """
+    words = [w for w in normalize(query).split() if w not in FILLER]
+    intent, _, _ = routing.classify_local(query)
+    return f"{intent or '?'}|{' '.join(words)}"
+
+def depends_on_history(query: str, chat_history: List[dict]) -> bool:
+    if not chat_history: return False
+    q = query.lower()
+    return bool(FOLLOW_UP.search(q)) or len(q.split()) < 3
+
+class ResponseCache:
+    """
+    TTL + LRU cache of /chat results, capped by total serialized size.
+    With an embedder registered, a miss also checks for a near-duplicate question.
+    """
+    def __init__(self, ttl: float, max_bytes: int, similarity: float):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.similarity = similarity
+        self.embedder: Optional[Callable[[str], List[float]]] = None
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.stats = {"hits": 0, "similar_hits": 0, "misses": 0, "bypassed": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+    def _drop(self, key: str):
+        entry = self.entries.pop(key)
+        self.bytes -= entry["size"]
+
+    def _embed(self, key: str):
+        if not self.embedder: return None
+        try:
+            return self.embedder(key.split("|", 1)[1])
+        except Exception as e:
+            print(f"⚠️ Cache embedder failed: {e}")
+            return None
+
+    def _nearest(self, key: str, vec) -> Optional[str]:
+        intent = key.split("|", 1)[0]
+        best, best_sim = None, self.similarity
+        for other, entry in self.entries.items():
+            if entry["vec"] is None or not other.startswith(intent + "|"): continue
+            sim = sum(a * b for a, b in zip(vec, entry["vec"]))
+            if sim >= best_sim: best, best_sim = other, sim
+        return best
+
+    def get(self, query: str) -> Optional[dict]:
+        key = cache_key(query)
+        with self._lock: exact = key in self.entries
+        # Embed outside the lock; the model call is the slow part.
+        vec = None if exact else self._embed(key)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None and vec is not None:
+                if near := self._nearest(key, vec):
+                    key, entry = near, self.entries[near]
+                    self.stats["similar_hits"] += 1
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if entry["expires"] < time.time():
+                self._drop(key)
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry["response"]
+
+    def put(self, query: str, response: dict):
+        key = cache_key(query)
+        size = len(json.dumps(response, default=str).encode())
+        if size > self.max_bytes: return
+        vec = self._embed(key)
+        with self._lock:
+            if key in self.entries: self._drop(key)
+            self.entries[key] = {"response": response, "size": size, "expires": time.time() + self.ttl, "vec": vec}
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self.entries)))
+                self.stats["evictions"] += 1
+
+    def bypass(self):
+        with self._lock: self.stats["bypassed"] += 1
+
+    def cache_stats(self):
+        with self._lock:
+            stats = dict(self.stats, entries=len(self.entries), bytes=self.bytes)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+response_cache = ResponseCache(RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_SIMILARITY)
@@ -0,0 +1,93 @@
+import os
+import re
+import math
+from typing import Optional, Tuple
+
+from .tools.suggest_index import get_index, normalize
+
+# Local tiers answer when they are at least this sure; otherwise the LLM decides.
+ROUTER_MIN_CONFIDENCE = float(os.environ.get("ROUTER_MIN_CONFIDENCE", 0.6))
+INTENTS = ("GENERAL", "SPECIFIC", "STATS", "DISCOVERY")
+
+GREETING = re.compile(r"^(hi+|hello+|hey+|hiya|yo|namaste|hola|good (morning|afternoon|evening|night)|thanks?|thank you|ok(ay)?|bye)\b[\s!.?]*$")
+META = re.compile(r"\b(who|what) (are|r) (you|u)\b|\bwhat can you do\b|\byour name\b")
+# Whole phrases only: "dress code", "stock up" or "the script cafe" are food questions.
+OFF_TOPIC = re.compile(
+    r"\b(?:write|generate|give me|debug|fix) (?:me )?(?:a |an |some |the )?(?:(?:python|javascript|java|sql|html) )?(?:code|program|script|function|essay)\b"
+    r"|\b(?:python|javascript) (?:code|program|script)\b"
+    r"|\bignore (?:all |any |previous |prior |your |the |above )+instructions\b"
+    r"|\bwho (?:is|was) (?:the )?(?:president|prime minister)\b"
+    r"|\b(?:stock|share) price\b|\bbitcoin\b|\b(?:my|do) homework\b|\belection results?\b"
+)
+TOP_N = re.compile(r"\btop\s*\d+\b|\b(highest|best|top)[- ]rated\b|\brank(ing|ed)?\b|\bcheapest\b|\bmost (popular|voted|reviewed)\b")
+BEST_IN = re.compile(r"\b(best|top|good|great)\b.*\bin\b")
+
+# Keyword weights for the last local tier, a tiny linear classifier.
+KEYWORDS = {
+    "GENERAL": {"joke": 2, "weather": 2, "hello": 1, "help": 1, "you": 0.5},
+    "SPECIFIC": {"rating": 1.5, "cost": 1.5, "price": 1.5, "menu": 2, "address": 2, "timings": 2, "open": 1, "located": 2, "how": 0.5, "is": 0.3, "review": 1},
+    "STATS": {"top": 2, "best": 1, "list": 1.5, "rated": 1.5, "highest": 2, "cheapest": 2, "most": 1, "under": 1, "below": 1, "ranking": 2},
+    "DISCOVERY": {"vibe": 2, "date": 2, "romantic": 2, "cozy": 2, "quiet": 2, "spot": 1.5, "spots": 1.5, "place": 1, "places": 1, "recommend": 2, "suggest": 2, "where": 1, "craving": 2, "want": 1, "try": 1, "good": 0.5, "rooftop": 2, "brunch": 1.5, "chill": 2},
+}
+
+# "batch": decided by one LLM call shared across a batch job's queries.
+_stats = {tier: 0 for tier in ("rules", "name", "stats", "classifier", "llm", "llm_fallback", "batch")}
+_saved_seconds = 0.0
+# Running estimate of what one LLM routing call costs, for the "saved" figure.
+_llm_latency = float(os.environ.get("ROUTER_LLM_LATENCY_ESTIMATE", 0.8))
+
+def _classify_keywords(q: str) -> Tuple[str, float]:
+    words = q.split()
+    scores = {label: sum(w.get(word, 0) for word in words) for label, w in KEYWORDS.items()}
+    exp = {label: math.exp(s) for label, s in scores.items()}
+    total = sum(exp.values())
+    label = max(exp, key=exp.get)
+    return label, exp[label] / total
+
+def classify_local(query: str) -> Tuple[Optional[str], float, str]:
+    """
+    Returns (intent, confidence, tier). intent is None when no local tier is confident.
+    """
+    q = normalize(query)
+    if not q or GREETING.match(q) or META.search(q) or OFF_TOPIC.search(q):
+        return "GENERAL", 0.95, "rules"
+
+    index = get_index()
+    has_top_n = bool(TOP_N.search(q))
+    # "best sushi in bandra west" is a ranking even if some restaurant is called "Sushi".
+    if has_top_n or (BEST_IN.search(q) and index and index.find_area(q)):
+        return "STATS", 0.85, "stats"
+    if index and index.find_in_text(q):
+        return "SPECIFIC", 0.9, "name"
+
+    label, confidence = _classify_keywords(q)
+    if confidence >= ROUTER_MIN_CONFIDENCE:
+        return label, confidence, "classifier"
+    return None, confidence, "classifier"
+
+def likely_intent(query: str) -> str:
+    """
+    The keyword classifier's best guess, however unsure.
+    """
+    return _classify_keywords(normalize(query))[0]
+
+def record(tier: str, llm_seconds: Optional[float] = None):
+    """
+    Counts a routing decision. LLM calls update the latency estimate;
+    local decisions add that estimate to the running total saved.
+    """
+    global _saved_seconds, _llm_latency
+    _stats[tier] += 1
+    if llm_seconds is not None:
+        _llm_latency = 0.8 * _llm_latency + 0.2 * llm_seconds
+    elif tier not in ("llm", "llm_fallback"):
+        _saved_seconds += _llm_latency
+
+def router_stats():
+    total = sum(_stats.values())
+    return {
+        "decisions": total,
+        "hit_rates": {tier: round(n / total, 3) if total else 0.0 for tier, n in _stats.items()},
+        "llm_latency_estimate_s": round(_llm_latency, 3),
+        "latency_saved_s": round(_saved_seconds, 2),
+    }
@@ -0,0 +1,218 @@
+import os
+import re
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+from . import context, routing
+from .tools.suggest_index import get_index, normalize
+
+SESSION_TTL = float(os.environ.get("SESSION_TTL", 6 * 3600))
+SESSION_MAX_BYTES = int(os.environ.get("SESSION_MAX_BYTES", 16 * 1024 * 1024))
+# Turns kept verbatim per session; older ones are folded into the rolling summary.
+SESSION_MAX_TURNS = int(os.environ.get("SESSION_MAX_TURNS", 10))
+# Set to "" to keep sessions in memory only.
+SESSION_STORE_PATH = os.environ.get(
+    "SESSION_STORE_PATH", str(Path(__file__).resolve().parents[1] / "data" / "sessions.db")
+)
+# Ids that many clients share, so nothing is stored under them: the API's old default
+# and the id every user of the pre-session frontend bundle sends.
+ANONYMOUS_SESSIONS = {"", "default", "user-session-v1"}
+
+# "what about its cost?" / "is it open now?": about the last restaurant, not a new search.
+# The pronoun has to be the subject, so "is there a rooftop bar?" and "hello there" don't count.
+PLACE = r"(?:it|its|it's|this place|that place|the place|same place)"
+REFERS_BACK = re.compile(
+    rf"^(?:(?:is|was|does|did|do|can|will|has|how is|hows|how's|what is|whats|what's|where is|wheres|where's|what about|how about)\s+)?{PLACE}\b"
+    rf"|\b(?:is|was|does|did|can|will|has)\s+{PLACE}\b"
+)
+# Longer questions are new requests that happen to contain a pronoun.
+FOLLOW_UP_MAX_WORDS = int(os.environ.get("FOLLOW_UP_MAX_WORDS", 8))
+NEW_SEARCH = re.compile(r"\b(another|else|other|others|instead|similar|more places|alternatives?)\b")
+
+def new_session() -> dict:
+    return {"history": [], "summary": "", "last_restaurant": None, "updated": time.time()}
+
+class SQLiteSessionBackend:
+    """
+    Persistent store behind the in-memory LRU. Any object with the same
+    load / save / delete / purge methods can be swapped in.
+    """
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT, updated REAL)")
+        self.conn.commit()
+        self.lock = threading.Lock()
+
+    def load(self, session_id: str) -> Optional[dict]:
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session_id: str, session: dict):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)",
+                              (session_id, json.dumps(session, default=str), session["updated"]))
+            self.conn.commit()
+
+    def delete(self, session_id: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self.conn.commit()
+
+    def purge(self, older_than: float) -> int:
+        with self.lock:
+            n = self.conn.execute("DELETE FROM sessions WHERE updated < ?", (older_than,)).rowcount
+            self.conn.commit()
+        return n
+
+class SessionStore:
+    """
+    Per-session history, rolling summary and last resolved restaurant.
+    Hot sessions live in an LRU capped by serialized size; every write also
+    goes to the backend, so evicted or restarted sessions come back from there.
+    """
+    def __init__(self, ttl: float, max_bytes: int, backend=None):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.stats = {"hits": 0, "store_hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+    def _drop(self, session_id: str):
+        self.bytes -= self.entries.pop(session_id)["size"]
+
+    def _cached(self, session_id: str):
+        with self._lock:
+            entry = self.entries.get(session_id)
+            if entry is None: return None
+            self.entries.move_to_end(session_id)
+            return entry["session"]
+
+    def _put(self, session_id: str, session: dict):
+        size = len(json.dumps(session, default=str).encode())
+        with self._lock:
+            if session_id in self.entries: self._drop(session_id)
+            self.entries[session_id] = {"session": session, "size": size}
+            self.bytes += size
+            while self.bytes > self.max_bytes and len(self.entries) > 1:
+                self._drop(next(iter(self.entries)))
+                self.stats["evictions"] += 1
+
+    def _expired(self, session: dict) -> bool:
+        return session["updated"] + self.ttl < time.time()
+
+    def get(self, session_id: str) -> dict:
+        session = self._cached(session_id)
+        if session is not None:
+            self.stats["hits"] += 1
+        elif self.backend and (session := self.backend.load(session_id)) is not None:
+            self.stats["store_hits"] += 1
+            self._put(session_id, session)
+        if session is None:
+            self.stats["misses"] += 1
+            return new_session()
+        if self._expired(session):
+            self.stats["expired"] += 1
+            self.delete(session_id)
+            return new_session()
+        return session
+
+    async def aget(self, session_id: str) -> dict:
+        """
+        LRU hits are answered inline; only backend reads go to a thread.
+        """
+        if self._cached(session_id) is not None or not self.backend:
+            return self.get(session_id)
+        return await asyncio.to_thread(self.get, session_id)
+
+    def save(self, session_id: str, session: dict):
+        session["updated"] = time.time()
+        self._put(session_id, session)
+        if self.backend: self.backend.save(session_id, session)
+
+    async def asave(self, session_id: str, session: dict):
+        session["updated"] = time.time()
+        self._put(session_id, session)
+        if self.backend: await asyncio.to_thread(self.backend.save, session_id, session)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            if session_id in self.entries: self._drop(session_id)
+        if self.backend: self.backend.delete(session_id)
+
+    def purge(self) -> int:
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for sid in [sid for sid, e in self.entries.items() if e["session"]["updated"] < cutoff]:
+                self._drop(sid)
+        return self.backend.purge(cutoff) if self.backend else 0
+
+    def cache_stats(self):
+        with self._lock:
+            stats = dict(self.stats, sessions=len(self.entries), bytes=self.bytes)
+        lookups = stats["hits"] + stats["store_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["store_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+session_store = SessionStore(SESSION_TTL, SESSION_MAX_BYTES, SQLiteSessionBackend(SESSION_STORE_PATH) if SESSION_STORE_PATH else None)
+
+async def load(session_id: str, chat_history: List[dict]) -> dict:
+    """
+    The session for this request. History the client still sends wins over
+    the stored copy; anonymous ids get a throwaway session.
+    """
+    session = new_session() if session_id in ANONYMOUS_SESSIONS else await session_store.aget(session_id)
+    if chat_history:
+        session = {**session, "history": chat_history}
+    return session
+
+def is_follow_up(query: str, session: dict) -> bool:
+    """
+    True when the query only makes sense about the last resolved restaurant.
+    """
+    if not session.get("last_restaurant"): return False
+    q = query.lower().strip()
+    if len(q.split()) > FOLLOW_UP_MAX_WORDS or not REFERS_BACK.search(q) or NEW_SEARCH.search(q): return False
+    # Naming a restaurant, area or cuisine makes it a new question; so does small talk.
+    if index := get_index():
+        n = normalize(q)
+        if index.find_in_text(n) or index.find_area(n) or index.find_cuisine(n): return False
+    return routing.classify_local(query)[0] != "GENERAL"
+
+def restaurant_from(result: dict) -> Optional[dict]:
+    """
+    The restaurant a SPECIFIC/DISCOVERY answer was about, if there is one.
+    """
+    if result.get("intent") == "DISCOVERY" and result.get("discovery"):
+        top = result["discovery"][0]
+        line = f"• {top['name']} ({top['area']}) - {top['rating']}⭐ | ₹{top['cost']}"
+        return {"name": top["name"], "data": line, "coordinates": top.get("coordinates")}
+    if result.get("intent") == "SPECIFIC" and (sql := result.get("sql")):
+        if m := context.DICT_NAME.search(sql):
+            return {"name": m.group(1), "data": sql, "coordinates": result.get("coordinates")}
+    return None
+
+async def record(session_id: str, session: dict, query: str, result: dict):
+    """
+    Appends the turn, folds overflow into the rolling summary and remembers
+    the restaurant the answer was about.
+    """
+    if session_id in ANONYMOUS_SESSIONS: return
+    history = session["history"] + [{"role": "user", "content": query}, {"role": "assistant", "content": result.get("response") or ""}]
+    overflow = max(0, len(history) - SESSION_MAX_TURNS)
+    session = {
+        **session,
+        "history": history[overflow:],
+        "summary": context.roll_summary(session.get("summary", ""), history[:overflow]),
+        "last_restaurant": restaurant_from(result) or session.get("last_restaurant"),
+    }
+    await session_store.asave(session_id, session)
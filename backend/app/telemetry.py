@@ -0,0 +1,143 @@
+import time
+import asyncio
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Prometheus-style latency buckets, in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUANTILES = (0.5, 0.95, 0.99)
+RESERVOIR_SIZE = 2048
+
+_trace: ContextVar[Optional[List[dict]]] = ContextVar("trace", default=None)
+_lock = threading.Lock()
+
+class Histogram:
+    """
+    Cumulative buckets for /metrics plus a bounded window of recent samples for percentiles.
+    """
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.n = 0
+        self.recent = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, seconds: float):
+        for i, b in enumerate(BUCKETS):
+            if seconds <= b: self.counts[i] += 1
+        self.total += seconds
+        self.n += 1
+        self.recent.append(seconds)
+
+    def quantile(self, q: float) -> float:
+        if not self.recent: return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+# name -> labels -> value
+_histograms: Dict[str, Dict[Tuple, Histogram]] = {}
+_counters: Dict[str, Dict[Tuple, float]] = {}
+_gauges: List[Callable[[], Dict[str, float]]] = []
+
+def _labels(**labels) -> Tuple:
+    return tuple(sorted(labels.items()))
+
+def observe(name: str, seconds: float, **labels):
+    with _lock:
+        _histograms.setdefault(name, {}).setdefault(_labels(**labels), Histogram()).observe(seconds)
+
+def inc(name: str, value: float = 1, **labels):
+    with _lock:
+        series = _counters.setdefault(name, {})
+        key = _labels(**labels)
+        series[key] = series.get(key, 0) + value
+
+def register_gauges(fn: Callable[[], Dict[str, float]]):
+    """
+    fn returns {metric_name: value}; called on every /metrics scrape.
+    """
+    _gauges.append(fn)
+    return fn
+
+def start_trace() -> List[dict]:
+    spans = []
+    _trace.set(spans)
+    return spans
+
+@contextmanager
+def span(name: str, kind: str):
+    """
+    Times a node/tool/upstream call into the current request's trace and
+    into the latency histogram for that kind. Works in threads started with
+    asyncio.to_thread, which copy the context.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if (spans := _trace.get()) is not None:
+            spans.append({"name": name, "kind": kind, "ms": round(elapsed * 1000, 1)})
+        observe(f"munchy_{kind}_latency_seconds", elapsed, **{kind: name})
+
+def traced_node(name: str, fn):
+    """
+    Wraps a graph node so its run time becomes a span.
+    """
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(state):
+            with span(name, "node"):
+                return await fn(state)
+    else:
+        @functools.wraps(fn)
+        def wrapper(state):
+            with span(name, "node"):
+                return fn(state)
+    return wrapper
+
+def record_tokens(response, source: str):
+    """
+    Adds an LLM response's token usage to the counters.
+    """
+    usage = getattr(response, "usage_metadata", None) or {}
+    inc("munchy_llm_calls_total", source=source)
+    if usage:
+        inc("munchy_llm_tokens_total", usage.get("input_tokens", 0), source=source, type="input")
+        inc("munchy_llm_tokens_total", usage.get("output_tokens", 0), source=source, type="output")
+
+def _fmt_labels(labels: Tuple, extra: Tuple = ()) -> str:
+    items = list(labels) + list(extra)
+    if not items: return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+def render_prometheus() -> str:
+    lines = []
+    with _lock:
+        for name, series in _histograms.items():
+            lines.append(f"# TYPE {name} histogram")
+            for labels, h in series.items():
+                for b, c in zip(BUCKETS, h.counts):
+                    lines.append(f"{name}_bucket{_fmt_labels(labels, (('le', b),))} {c}")
+                lines.append(f"{name}_bucket{_fmt_labels(labels, (('le', '+Inf'),))} {h.n}")
+                lines.append(f"{name}_sum{_fmt_labels(labels)} {round(h.total, 6)}")
+                lines.append(f"{name}_count{_fmt_labels(labels)} {h.n}")
+            lines.append(f"# TYPE {name}_quantile gauge")
+            for labels, h in series.items():
+                for q in QUANTILES:
+                    lines.append(f"{name}_quantile{_fmt_labels(labels, (('quantile', q),))} {round(h.quantile(q), 6)}")
+        for name, series in _counters.items():
+            lines.append(f"# TYPE {name} counter")
+            for labels, v in series.items():
+                lines.append(f"{name}{_fmt_labels(labels)} {v}")
+    for fn in _gauges:
+        try:
+            for name, v in fn().items():
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {v}")
+        except Exception as e:
+            print(f"⚠️ Gauge callback failed: {e}")
+    return "\n".join(lines) + "\n"
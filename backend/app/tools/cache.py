@@ -0,0 +1,78 @@
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    Small LRU with per-entry expiry, for upstream lookup results.
+    """
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    def get(self, key: str, default=None):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None: del self.entries[key]
+            self.stats["misses"] += 1
+            return default
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry[1]
+
+    def __contains__(self, key: str) -> bool:
+        """
+        Fresh entry present; doesn't touch hit/miss stats or LRU order.
+        """
+        entry = self.entries.get(key)
+        return entry is not None and entry[0] >= time.monotonic()
+
+    def set(self, key: str, value: Any):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def cache_stats(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return dict(self.stats, size=len(self.entries), hit_rate=round(self.stats["hits"] / lookups, 3) if lookups else 0.0)
+
+class SingleFlight:
+    """
+    Concurrent calls for the same key share one in-flight upstream call.
+    The call runs as its own task, so a caller timing out doesn't cancel it for the others.
+    """
+    def __init__(self):
+        self.inflight: Dict[str, asyncio.Task] = {}
+
+    def _done(self, key: str, task: asyncio.Task):
+        self.inflight.pop(key, None)
+        # Mark any exception retrieved even if every waiter has gone away.
+        if not task.cancelled(): task.exception()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]):
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self.inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+async def cached_call(cache: TTLCache, flight: SingleFlight, key: str,
+                      fn: Callable[[], Awaitable[Any]], cacheable: Optional[Callable[[Any], bool]] = None):
+    """
+    TTL cache in front of a single-flight upstream call. Results failing
+    `cacheable` (e.g. error strings) are returned but not stored.
+    """
+    hit = cache.get(key, _MISSING)
+    if hit is not _MISSING: return hit
+    if key in flight.inflight: cache.stats["coalesced"] += 1
+    result = await flight.do(key, fn)
+    if cacheable is None or cacheable(result):
+        cache.set(key, result)
+    return result
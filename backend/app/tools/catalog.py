@@ -0,0 +1,158 @@
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .suggest_index import normalize, on_refresh
+
+def _intern(values: List[str]):
+    """
+    (codes, distinct values) for a string column: each distinct string is
+    stored once and rows point at it by int32 code.
+    """
+    lookup: Dict[str, int] = {}
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, v in enumerate(values):
+        codes[i] = lookup.setdefault(sys.intern(v), len(lookup))
+    return codes, list(lookup)
+
+class Catalog:
+    """
+    Column-oriented snapshot of the restaurants table. Rating, cost and
+    votes are NumPy arrays; area and cuisine are interned and stored as
+    codes. Filters are vectorised masks over the columns, so the simple
+    lookups the tools make never leave the process.
+    """
+    def __init__(self, rows: List[dict]):
+        self.names = [sys.intern(str(r["name"])) for r in rows]
+        self.lower_names = [n.lower() for n in self.names]
+        self.urls = [r.get("url") for r in rows]
+        self.rating = np.array([float(r.get("rating") or 0) for r in rows], dtype=np.float32)
+        self.cost = np.array([float(r.get("cost") or 0) for r in rows], dtype=np.float32)
+        self.votes = np.array([int(r.get("votes") or 0) for r in rows], dtype=np.int32)
+        # Same vote-weighted score as the leaderboards.
+        self.score = self.rating * np.log1p(self.votes, dtype=np.float32)
+        self.area_codes, self.areas = _intern([str(r["area"] or "") for r in rows])
+        self.cuisine_codes, self.cuisines = _intern([str(r.get("cuisine") or "") for r in rows])
+        self.area_ids = {normalize(a): code for code, a in enumerate(self.areas)}
+        self.by_key = {(normalize(n), normalize(self.areas[a])): i for i, (n, a) in enumerate(zip(self.names, self.area_codes))}
+
+    def __len__(self):
+        return len(self.names)
+
+    def _codes_matching(self, values: List[str], text: str) -> np.ndarray:
+        # Case-insensitive substring test once per distinct value, not once per row.
+        text = text.lower()
+        return np.array([text in v.lower() for v in values] or [False], dtype=bool)
+
+    def mask(self, area: Optional[str] = None, cuisine: Optional[str] = None,
+             max_cost: Optional[float] = None, min_rating: Optional[float] = None) -> np.ndarray:
+        """
+        Rows passing every given filter. Area is an exact match on the
+        stored value (ignoring case/punctuation); cuisine matches like
+        "cuisine ILIKE %x%".
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if area is not None:
+            code = self.area_ids.get(normalize(area))
+            if code is None: return np.zeros(len(self), dtype=bool)
+            mask &= self.area_codes == code
+        if cuisine is not None:
+            mask &= self._codes_matching(self.cuisines, cuisine)[self.cuisine_codes]
+        if max_cost is not None: mask &= self.cost <= max_cost
+        if min_rating is not None: mask &= self.rating >= min_rating
+        return mask
+
+    def matching(self, text: str) -> np.ndarray:
+        """
+        Rows whose name, cuisine or area contains the text (the ILIKE
+        fallback the fuzzy search used to send to Postgres).
+        """
+        q = text.lower()
+        names = np.array([q in n for n in self.lower_names], dtype=bool)
+        return (names | self._codes_matching(self.cuisines, q)[self.cuisine_codes]
+                | self._codes_matching(self.areas, q)[self.area_codes])
+
+    def top_k(self, mask: np.ndarray, k: int, order: str = "rating") -> np.ndarray:
+        """
+        Row ids of the best k rows in the mask: by rating then votes, or by
+        vote-weighted score with order="score".
+        """
+        ids = np.flatnonzero(mask)
+        if len(ids) > k:
+            # Cut to the k best by the primary key first; the sort below only sees those plus ties.
+            primary = self.score[ids] if order == "score" else self.rating[ids]
+            cutoff = np.partition(primary, len(ids) - k)[len(ids) - k]
+            ids = ids[primary >= cutoff]
+        if order == "score":
+            ids = ids[np.argsort(-self.score[ids], kind="stable")]
+        else:
+            ids = ids[np.lexsort((-self.votes[ids], -self.rating[ids]))]
+        return ids[:k]
+
+    def query(self, area: Optional[str] = None, cuisine: Optional[str] = None,
+              max_cost: Optional[float] = None, min_rating: Optional[float] = None,
+              limit: int = 5, order: str = "rating") -> List[dict]:
+        """
+        In-memory equivalent of query_planner.compile_stats.
+        """
+        return self.rows(self.top_k(self.mask(area, cuisine, max_cost, min_rating), limit, order))
+
+    def find(self, name: str, area: str) -> Optional[dict]:
+        i = self.by_key.get((normalize(name), normalize(area)))
+        return self.row(i) if i is not None else None
+
+    def find_name_like(self, text: str) -> Optional[dict]:
+        """
+        Best rated restaurant whose name contains the text ("name ILIKE %x%").
+        """
+        q = text.lower()
+        ids = [i for i, n in enumerate(self.lower_names) if q in n]
+        return self.row(max(ids, key=lambda i: (self.rating[i], self.votes[i]))) if ids else None
+
+    def row(self, i: int) -> dict:
+        return {
+            "name": self.names[i], "area": self.areas[self.area_codes[i]], "cuisine": self.cuisines[self.cuisine_codes[i]],
+            # float32 -> the value as stored (4.3, not 4.300000190734863).
+            "rating": round(float(self.rating[i]), 2), "cost": round(float(self.cost[i]), 2),
+            "votes": int(self.votes[i]), "url": self.urls[i],
+        }
+
+    def rows(self, ids) -> List[dict]:
+        return [self.row(int(i)) for i in ids]
+
+    def area_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.area_codes, minlength=len(self.areas))
+        return {a: int(c) for a, c in sorted(zip(self.areas, counts)) if a}
+
+    def memory_bytes(self) -> int:
+        arrays = sum(a.nbytes for a in (self.rating, self.cost, self.votes, self.score, self.area_codes, self.cuisine_codes))
+        strings = sum(sys.getsizeof(s) for s in (*self.names, *self.lower_names, *self.areas, *self.cuisines, *self.urls) if s)
+        lists = sum(sys.getsizeof(l) for l in (self.names, self.lower_names, self.urls, self.areas, self.cuisines))
+        dicts = sys.getsizeof(self.area_ids) + sys.getsizeof(self.by_key)
+        return arrays + strings + lists + dicts
+
+_catalog: Optional[Catalog] = None
+_stats = {"loaded_at": None, "build_s": None}
+
+def get_catalog() -> Optional[Catalog]:
+    return _catalog
+
+def catalog_stats():
+    catalog = _catalog
+    if catalog is None: return {"rows": 0, "bytes": 0}
+    return {
+        "rows": len(catalog), "areas": len(catalog.areas), "cuisines": len(catalog.cuisines),
+        "bytes": catalog.memory_bytes(), **_stats,
+    }
+
+@on_refresh
+def _refresh(rows: List[dict]):
+    global _catalog
+    start = time.perf_counter()
+    catalog = Catalog(rows)
+    # One reference swap: readers holding the old snapshot finish with it.
+    _catalog = catalog
+    _stats.update(loaded_at=time.time(), build_s=round(time.perf_counter() - start, 3))
+    print(f"✅ Catalog built: {len(catalog)} restaurants, {catalog.memory_bytes() / 1e6:.1f} MB in {_stats['build_s']:.2f}s")
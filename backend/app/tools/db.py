@@ -0,0 +1,94 @@
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from dotenv import load_dotenv
+
+from .. import limits
+
+load_dotenv()
+
+SUPABASE_URL = os.environ.get("SUPABASE_URL")
+POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", 1))
+POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", 10))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))
+
+pool: Optional[AsyncConnectionPool] = None
+_checkout = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+
+async def open_pool():
+    """
+    Opens the shared async pool. Called once from FastAPI startup.
+    """
+    global pool
+    if pool is not None: return pool
+    if not SUPABASE_URL:
+        print("❌ DB Error: SUPABASE_URL is not set, pool not opened.")
+        return None
+    pool = AsyncConnectionPool(
+        SUPABASE_URL,
+        min_size=POOL_MIN_SIZE,
+        max_size=POOL_MAX_SIZE,
+        timeout=POOL_TIMEOUT,
+        kwargs={"row_factory": dict_row},
+        open=False,
+    )
+    await pool.open()
+    print(f"✅ DB pool opened (min={POOL_MIN_SIZE}, max={POOL_MAX_SIZE})")
+    return pool
+
+async def close_pool():
+    global pool
+    if pool is not None:
+        await pool.close()
+        pool = None
+        print("DB pool closed.")
+
+@asynccontextmanager
+async def connection():
+    """
+    Checks a connection out of the pool, recording how long the checkout took.
+    """
+    if pool is None and await open_pool() is None:
+        raise RuntimeError("Database pool is not available.")
+    start = time.perf_counter()
+    async with limits.upstream("postgres"), pool.connection() as conn:
+        elapsed = (time.perf_counter() - start) * 1000
+        _checkout["count"] += 1
+        _checkout["total_ms"] += elapsed
+        _checkout["max_ms"] = max(_checkout["max_ms"], elapsed)
+        yield conn
+
+async def fetch_all(sql: str, params=None, prepare: Optional[bool] = None):
+    async with connection() as conn:
+        cur = await conn.execute(sql, params, prepare=prepare)
+        return await cur.fetchall()
+
+async def fetch_one(sql: str, params=None, prepare: Optional[bool] = None):
+    async with connection() as conn:
+        cur = await conn.execute(sql, params, prepare=prepare)
+        return await cur.fetchone()
+
+def pool_metrics():
+    """
+    Pool size, wait time and checkout latency, for /health.
+    """
+    count = _checkout["count"]
+    metrics = {
+        "checkouts": count,
+        "checkout_avg_ms": round(_checkout["total_ms"] / count, 2) if count else 0.0,
+        "checkout_max_ms": round(_checkout["max_ms"], 2),
+    }
+    if pool is None:
+        return {"status": "closed", **metrics}
+    stats = pool.get_stats()
+    return {
+        "status": "open",
+        "pool_size": stats.get("pool_size", 0),
+        "pool_available": stats.get("pool_available", 0),
+        "requests_waiting": stats.get("requests_waiting", 0),
+        "requests_wait_ms": stats.get("requests_wait_ms", 0),
+        **metrics,
+    }
@@ -0,0 +1,163 @@
+import os
+import re
+import math
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from .suggest_index import get_index, normalize, on_refresh
+from .geocode import address_for, aget_coordinates
+
+# ~1.1 km cells at Mumbai's latitude; a radius query scans only the cells its box touches.
+GEO_CELL_DEGREES = float(os.environ.get("GEO_CELL_DEGREES", 0.01))
+GEO_DEFAULT_RADIUS_KM = float(os.environ.get("GEO_DEFAULT_RADIUS_KM", 2))
+GEO_MAX_RADIUS_KM = 25
+EARTH_RADIUS_KM = 6371.0
+ME = {"me", "my location", "here", "my place"}
+
+# "within 3 km of Bandra", "near Gateway of India", "around 19.07, 72.87"
+RADIUS = re.compile(r"\bwithin\s*(\d+(?:\.\d+)?)\s*(km|kms|kilometers?|m|meters?|metres?)\b")
+# A unit only counts with a number in front: "2 km from Bandra", not "I'm from Pune".
+NEAR = re.compile(r"(?:\b(?:near(?:by)?|around|close to|next to|walking distance (?:of|from))|\d\s*(?:km|kms|kilometers?|m|meters?|metres?)\s+(?:of|from))\s+(?:the\s+)?([a-z].*)$")
+LAT_LNG = re.compile(r"(-?\d{1,2}\.\d+)\s*,\s*(-?\d{1,3}\.\d+)")
+# Filters that trail the place name ("near Juhu beach under 800 rated 4+").
+PLACE_END = re.compile(r"\s+(?:under|below|less than|within|upto|up to|max|cheaper than|rated|rating|with|for|that|which|serving|open)\b.*$")
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+class GeoIndex:
+    """
+    Uniform lat/lng grid over the catalog entries that have coordinates.
+    Area centroids (mean of their restaurants) let "near <area>" resolve
+    without a geocoding call.
+    """
+    def __init__(self, entries: List[dict], cell: float = GEO_CELL_DEGREES):
+        self.cell = cell
+        self.entries = entries
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        self.by_key: Dict[Tuple[str, str], dict] = {}
+        sums: Dict[str, List[float]] = {}
+        for i, e in enumerate(entries):
+            if not (c := e.get("coordinates")): continue
+            self.cells.setdefault(self._cell(c["lat"], c["lng"]), []).append(i)
+            self.by_key[(normalize(e["name"]), normalize(e["area"]))] = c
+            s = sums.setdefault(normalize(e["area"]), [0.0, 0.0, 0])
+            s[0] += c["lat"]; s[1] += c["lng"]; s[2] += 1
+        self.centroids = {a: {"lat": s[0] / s[2], "lng": s[1] / s[2]} for a, s in sums.items()}
+        self.size = sum(len(ids) for ids in self.cells.values())
+
+    def __len__(self):
+        return self.size
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell)), int(math.floor(lng / self.cell))
+
+    def coordinates(self, name: str, area: str) -> Optional[dict]:
+        return self.by_key.get((normalize(name), normalize(area)))
+
+    def within(self, lat: float, lng: float, radius_km: float, cuisine: Optional[str] = None,
+               max_cost: Optional[float] = None, min_rating: Optional[float] = None,
+               limit: int = 5, order: str = "rating") -> List[dict]:
+        """
+        Restaurants within radius_km of (lat, lng) that pass the filters,
+        best rated first (or nearest first with order="distance").
+        """
+        dlat = radius_km / 111.32
+        dlng = radius_km / (111.32 * max(math.cos(math.radians(lat)), 1e-6))
+        (r0, c0), (r1, c1) = self._cell(lat - dlat, lng - dlng), self._cell(lat + dlat, lng + dlng)
+        cuisine = cuisine.lower() if cuisine else None
+        hits = []
+        for r in range(r0, r1 + 1):
+            for c in range(c0, c1 + 1):
+                for i in self.cells.get((r, c), ()):
+                    e = self.entries[i]
+                    if max_cost is not None and e["cost"] > max_cost: continue
+                    if min_rating is not None and e["rating"] < min_rating: continue
+                    if cuisine and cuisine not in str(e.get("cuisine") or "").lower(): continue
+                    d = haversine_km(lat, lng, e["coordinates"]["lat"], e["coordinates"]["lng"])
+                    if d <= radius_km: hits.append((d, e))
+        if order == "distance":
+            hits.sort(key=lambda h: h[0])
+        elif order == "score":
+            hits.sort(key=lambda h: -h[1]["rating"] * math.log1p(h[1]["votes"]))
+        else:
+            hits.sort(key=lambda h: (-h[1]["rating"], -h[1]["votes"]))
+        return [{
+            "name": e["name"], "area": e["area"], "cuisine": e.get("cuisine"), "rating": e["rating"],
+            "cost": e["cost"], "url": e.get("url"), "distance_km": round(d, 2), "coordinates": e["coordinates"],
+        } for d, e in hits[:limit]]
+
+_geo: Optional[GeoIndex] = None
+# Where the client says the user is, for "near me" (set per request).
+_user_location: ContextVar[Optional[dict]] = ContextVar("user_location", default=None)
+
+def set_user_location(location: Optional[dict]):
+    _user_location.set(location)
+
+def get_geo_index() -> Optional[GeoIndex]:
+    return _geo
+
+@on_refresh
+def _refresh(rows: List[dict]):
+    global _geo
+    if (index := get_index()) is None: return
+    start = time.perf_counter()
+    _geo = GeoIndex(index.entries)
+    print(f"✅ Geo index built: {len(_geo)} of {len(index)} restaurants placed in {time.perf_counter() - start:.2f}s")
+
+async def coordinates_for(name: str, area: str) -> Optional[dict]:
+    """
+    Stored coordinates from the index; the geocode cache only for rows it doesn't know.
+    """
+    if _geo and (c := _geo.coordinates(name, area)): return c
+    return await aget_coordinates(address_for(name, area))
+
+def parse_near(text: str) -> Optional[Tuple[str, float]]:
+    """
+    (place, radius_km) for a distance question, else None. place is the
+    text after "near"/"km of", or "lat,lng" when coordinates are given.
+    """
+    raw = text.lower()
+    radius = RADIUS.search(raw)
+    near = NEAR.search(raw)
+    coords = LAT_LNG.search(raw)
+    if not (radius or near or coords or "nearby" in raw): return None
+    km = GEO_DEFAULT_RADIUS_KM
+    if radius:
+        km = float(radius.group(1)) / (1 if radius.group(2).startswith("k") else 1000)
+    km = min(max(km, 0.1), GEO_MAX_RADIUS_KM)
+    if coords:
+        return f"{coords.group(1)},{coords.group(2)}", km
+    if not near:
+        # "cafes nearby" / "within 1 km" with no place: around the user.
+        return ("me", km) if re.search(r"\bnearby\b", raw) or radius else None
+    place = PLACE_END.sub("", near.group(1)).strip(" ?.!,")
+    return (place, km) if place else None
+
+async def locate(place: str) -> Optional[dict]:
+    """
+    Centre point for a place: literal coordinates, the client's location for
+    "me", a known area's centroid, then the geocode cache/API for landmarks.
+    """
+    if m := LAT_LNG.fullmatch(place.strip()):
+        return {"lat": float(m.group(1)), "lng": float(m.group(2))}
+    if place in ME:
+        return _user_location.get()
+    if _geo:
+        index = get_index()
+        area = index.find_area(place) if index else None
+        if area and (c := _geo.centroids.get(normalize(area))): return c
+    return await aget_coordinates(f"{place}, Mumbai")
+
+async def search_near(place: str, radius_km: float, **filters) -> Optional[List[dict]]:
+    """
+    None when the place can't be located or the index isn't built, so callers can fall back.
+    """
+    if _geo is None: return None
+    centre = await locate(place)
+    if centre is None: return None
+    return _geo.within(centre["lat"], centre["lng"], radius_km, **filters)
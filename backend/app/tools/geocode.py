@@ -0,0 +1,144 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import asyncio
+import requests
+from dotenv import load_dotenv
+
+from .. import telemetry, limits
+
+load_dotenv()
+
+GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+GEOCODE_CACHE_PATH = os.environ.get(
+    "GEOCODE_CACHE_PATH", str(Path(__file__).resolve().parents[2] / "data" / "geocode_cache.db")
+)
+GEOCODE_LRU_SIZE = int(os.environ.get("GEOCODE_LRU_SIZE", 4096))
+
+# Sentinel so a cached "no result" isn't confused with a cache miss.
+_MISSING = object()
+
+_lru = OrderedDict()
+_lock = threading.Lock()
+_store = None
+_stats = {"lru_hits": 0, "store_hits": 0, "misses": 0, "errors": 0}
+
+def address_for(name: str, area: str) -> str:
+    return f"{name}, {area}, Mumbai"
+
+def _key(address: str) -> str:
+    return " ".join(address.lower().split())
+
+def _get_store():
+    global _store
+    if _store is None:
+        Path(GEOCODE_CACHE_PATH).parent.mkdir(parents=True, exist_ok=True)
+        _store = sqlite3.connect(GEOCODE_CACHE_PATH, check_same_thread=False)
+        _store.execute("CREATE TABLE IF NOT EXISTS geocode (address TEXT PRIMARY KEY, lat REAL, lng REAL)")
+        _store.commit()
+    return _store
+
+def _lru_put(key: str, coords):
+    _lru[key] = coords
+    _lru.move_to_end(key)
+    if len(_lru) > GEOCODE_LRU_SIZE:
+        _lru.popitem(last=False)
+
+def _lookup_cached(key: str):
+    """
+    LRU first, then the SQLite store. Returns _MISSING if neither has it.
+    """
+    with _lock:
+        if key in _lru:
+            _lru.move_to_end(key)
+            _stats["lru_hits"] += 1
+            return _lru[key]
+        row = _get_store().execute("SELECT lat, lng FROM geocode WHERE address = ?", (key,)).fetchone()
+        if row is None: return _MISSING
+        coords = {"lat": row[0], "lng": row[1]} if row[0] is not None else None
+        _stats["store_hits"] += 1
+        _lru_put(key, coords)
+        return coords
+
+def _fetch_remote(address: str):
+    response = requests.get(GEOCODE_URL, params={"address": address, "key": GOOGLE_API_KEY}, timeout=5)
+    data = response.json()
+    if data['status'] == 'OK':
+        loc = data['results'][0]['geometry']['location']
+        return {"lat": loc['lat'], "lng": loc['lng']}
+    if data['status'] == 'ZERO_RESULTS':
+        return None
+    raise RuntimeError(f"Geocoding failed: {data['status']}")
+
+def _save(key: str, coords):
+    with _lock:
+        lat, lng = (coords["lat"], coords["lng"]) if coords else (None, None)
+        store = _get_store()
+        store.execute("INSERT OR REPLACE INTO geocode (address, lat, lng) VALUES (?, ?, ?)", (key, lat, lng))
+        store.commit()
+        _lru_put(key, coords)
+
+def get_coordinates(address: str):
+    """
+    Cached geocode. Only unknown addresses reach the Google API;
+    "no result" answers are cached too so they aren't retried.
+    """
+    key = _key(address)
+    cached = _lookup_cached(key)
+    if cached is not _MISSING: return cached
+    if not GOOGLE_API_KEY: return None
+    with _lock: _stats["misses"] += 1
+    try:
+        with limits.upstream_sync("geocoding"), telemetry.span("geocoding", "upstream"):
+            coords = _fetch_remote(address)
+    except Exception as e:
+        with _lock: _stats["errors"] += 1
+        telemetry.inc("munchy_upstream_errors_total", upstream="geocoding")
+        print(f"❌ Geocode Error: {e}")
+        return None
+    _save(key, coords)
+    return coords
+
+def peek_coordinates(address: str):
+    """
+    Cache-only lookup: returns None for unknown addresses instead of calling out.
+    """
+    cached = _lookup_cached(_key(address))
+    return None if cached is _MISSING else cached
+
+async def aget_coordinates(address: str):
+    """
+    Answers LRU hits inline; only store reads and network calls go to a thread.
+    """
+    key = _key(address)
+    with _lock:
+        if key in _lru:
+            _lru.move_to_end(key)
+            _stats["lru_hits"] += 1
+            return _lru[key]
+    return await asyncio.to_thread(get_coordinates, address)
+
+def backfill(addresses, workers: int = 8):
+    """
+    Bulk-geocodes every address not already in the store.
+    Used by the ingest pipeline so the hot path never hits the network.
+    Returns {address: coords} for all inputs.
+    """
+    addresses = list(addresses)
+    pending = [a for a in dict.fromkeys(addresses) if _lookup_cached(_key(a)) is _MISSING]
+    print(f"Geocoding {len(pending)} new addresses...")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(get_coordinates, pending))
+    return {a: get_coordinates(a) for a in addresses}
+
+def cache_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats["lru_size"] = len(_lru)
+    lookups = stats["lru_hits"] + stats["store_hits"] + stats["misses"]
+    stats["hit_rate"] = round((stats["lru_hits"] + stats["store_hits"]) / lookups, 3) if lookups else 0.0
+    return stats
@@ -0,0 +1,118 @@
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .suggest_index import normalize, on_refresh
+
+# How many entries each ranking keeps. Lookups that need to look deeper fall back to SQL.
+LEADERBOARD_SIZE = 50
+COST_BUCKETS = (300, 500, 800, 1200, 2000, 3000)
+
+def vote_score(rating: float, votes: int) -> float:
+    """
+    Vote-weighted score, so a 4.6 with 3k votes outranks a 4.9 with 4.
+    """
+    return round(rating * math.log1p(votes), 4)
+
+def cost_bucket(cost: float) -> Optional[int]:
+    return next((b for b in COST_BUCKETS if cost <= b), None)
+
+def _keys_for(row: dict) -> List[Tuple]:
+    keys = []
+    area = normalize(row["area"])
+    cuisines = {normalize(c) for c in str(row.get("cuisine") or "").split(",") if c.strip()}
+    if area: keys.append(("area", area))
+    for c in cuisines:
+        keys.append(("cuisine", c))
+        if area: keys.append(("area_cuisine", area, c))
+    # A restaurant belongs to every bucket whose ceiling it fits under.
+    for b in COST_BUCKETS:
+        if row["cost"] <= b: keys.append(("cost", b))
+    return keys
+
+class Leaderboards:
+    """
+    Top-k rankings per area, cuisine, area+cuisine and cost ceiling,
+    ordered by rating (ties by votes) and by vote-weighted score.
+    update() only re-sorts the rankings touched by changed rows.
+    """
+    def __init__(self):
+        self.rows: Dict[Tuple[str, str], dict] = {}
+        self.members: Dict[Tuple, set] = {}
+        self.by_rating: Dict[Tuple, List[dict]] = {}
+        self.by_score: Dict[Tuple, List[dict]] = {}
+        self._lock = threading.Lock()
+
+    def _rank(self, key: Tuple):
+        members = [self.rows[rid] for rid in self.members.get(key, ())]
+        if not members:
+            self.by_rating.pop(key, None)
+            self.by_score.pop(key, None)
+            return
+        self.by_rating[key] = sorted(members, key=lambda r: (-r["rating"], -r["votes"]))[:LEADERBOARD_SIZE]
+        self.by_score[key] = sorted(members, key=lambda r: -r["score"])[:LEADERBOARD_SIZE]
+
+    def update(self, rows: List[dict]) -> int:
+        """
+        Applies a fresh snapshot of the table. Returns how many rankings were rebuilt.
+        """
+        fresh = {}
+        for r in rows:
+            row = {
+                "name": r["name"], "area": r["area"], "cuisine": r.get("cuisine"),
+                "rating": float(r.get("rating") or 0), "cost": float(r.get("cost") or 0),
+                "votes": int(r.get("votes") or 0),
+            }
+            row["score"] = vote_score(row["rating"], row["votes"])
+            fresh[(row["name"], row["area"])] = row
+
+        with self._lock:
+            dirty = set()
+            for rid in self.rows.keys() | fresh.keys():
+                old, new = self.rows.get(rid), fresh.get(rid)
+                if old == new: continue
+                if old:
+                    for key in _keys_for(old):
+                        self.members[key].discard(rid)
+                        dirty.add(key)
+                if new:
+                    for key in _keys_for(new):
+                        self.members.setdefault(key, set()).add(rid)
+                        dirty.add(key)
+            self.rows = fresh
+            for key in dirty:
+                self._rank(key)
+        return len(dirty)
+
+    def lookup(self, area: Optional[str] = None, cuisine: Optional[str] = None,
+               max_cost: Optional[float] = None, min_rating: Optional[float] = None,
+               limit: int = 5, order: str = "rating") -> Optional[List[dict]]:
+        """
+        O(k) answer from the closest ranking, or None if no ranking can answer it exactly.
+        """
+        if area and cuisine: key = ("area_cuisine", normalize(area), normalize(cuisine))
+        elif area: key = ("area", normalize(area))
+        elif cuisine: key = ("cuisine", normalize(cuisine))
+        elif max_cost is not None and cost_bucket(max_cost): key = ("cost", cost_bucket(max_cost))
+        else: return None
+
+        ranking = (self.by_score if order == "score" else self.by_rating).get(key)
+        if ranking is None:
+            return None if key not in self.members else []
+        out = []
+        for r in ranking:
+            if max_cost is not None and r["cost"] > max_cost: continue
+            if min_rating is not None and r["rating"] < min_rating: continue
+            out.append(r)
+            if len(out) == limit: return out
+        # Ran off the end of a truncated ranking: can't be sure nothing better is below it.
+        if len(ranking) == LEADERBOARD_SIZE and len(self.members[key]) > LEADERBOARD_SIZE:
+            return None
+        return out
+
+leaderboards = Leaderboards()
+
+@on_refresh
+def _refresh(rows: List[dict]):
+    rebuilt = leaderboards.update(rows)
+    print(f"✅ Leaderboards refreshed: {rebuilt} rankings rebuilt")
@@ -0,0 +1,122 @@
+import re
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from .suggest_index import get_index, normalize, DISH_CUISINES
+from .geo_index import parse_near, RADIUS
+
+DEFAULT_LIMIT = 5
+MAX_LIMIT = 20
+CHEAP_COST = 600
+
+COST_CEILING = re.compile(r"\b(?:under|below|less than|within|upto|up to|max|cheaper than)\s*(?:rs\.?|inr|₹)?\s*(\d[\d,]*)")
+CHEAP = re.compile(r"\b(cheap|budget|affordable|pocket friendly)\b")
+# A bare "4 or more" is usually a head count, so a whole number needs a rating word or star;
+# "4.5+" is a rating on its own.
+MIN_RATING = re.compile(
+    r"\b(?:rated|rating|ratings)\s*(?:above|over|at least|of at least|more than|>=?)?\s*(\d(?:\.\d)?)\b"
+    r"|\b(\d(?:\.\d)?)\s*(?:\+|plus|or more|and above)?\s*(?:stars?|⭐|rated|rating)"
+    r"|\b(\d\.\d)\s*(?:\+|plus|or more|and above)"
+)
+NEAREST = re.compile(r"\b(nearest|closest)\b")
+POPULAR = re.compile(r"\b(popular|most voted|most reviewed|well known|famous|crowd favou?rite)\b")
+TOP_N = re.compile(r"\btop\s*(\d{1,2})\b|\b(\d{1,2})\s+(?:best|top|highest)\b")
+
+@dataclass
+class QueryPlan:
+    area: Optional[str] = None
+    cuisine: Optional[str] = None
+    max_cost: Optional[float] = None
+    min_rating: Optional[float] = None
+    limit: int = DEFAULT_LIMIT
+    # "rating" sorts like the old LLM SQL; "score" is the vote-weighted rating; "distance" needs near.
+    order: str = "rating"
+    # Centre of a distance question ("near Juhu beach") and its radius.
+    near: Optional[str] = None
+    radius_km: Optional[float] = None
+    # The question asked for a count ("top 10"), so a plain ranking answers it.
+    ranked: bool = False
+
+    def has_filters(self) -> bool:
+        """
+        True when the plan compiles to SQL by itself: some filter, or a bare
+        "top N" / "most popular" ranking.
+        """
+        return self.ranked or self.order != "rating" or any(
+            v is not None for v in (self.area, self.cuisine, self.max_cost, self.min_rating, self.near))
+
+def plan_query(text: str) -> QueryPlan:
+    """
+    Pulls structured filters out of a STATS question.
+    Areas and cuisines are matched against the values actually in the table.
+    """
+    q = normalize(text)
+    # "within 2 km" is a radius, not a cost ceiling.
+    raw = RADIUS.sub(" ", text.lower())
+    plan = QueryPlan()
+    if index := get_index():
+        plan.area = index.find_area(q)
+        plan.cuisine = index.find_cuisine(q)
+    if plan.cuisine is None:
+        plan.cuisine = next((c for dish, c in DISH_CUISINES.items() if f" {dish} " in f" {q} "), None)
+
+    if m := COST_CEILING.search(raw):
+        plan.max_cost = float(m.group(1).replace(",", ""))
+    elif CHEAP.search(q):
+        plan.max_cost = CHEAP_COST
+
+    if m := MIN_RATING.search(raw):
+        rating = float(next(g for g in m.groups() if g))
+        if rating <= 5: plan.min_rating = rating
+
+    if POPULAR.search(q):
+        plan.order = "score"
+
+    if near := parse_near(text):
+        plan.near, plan.radius_km = near
+        # "within 2 km of Bandra" centres on the area rather than filtering by it.
+        if plan.area and index and index.find_area(plan.near) == plan.area:
+            plan.area = None
+        if NEAREST.search(q):
+            plan.order = "distance"
+
+    if m := TOP_N.search(q):
+        plan.limit = max(1, min(MAX_LIMIT, int(m.group(1) or m.group(2))))
+        plan.ranked = True
+    return plan
+
+def compile_stats(plan: QueryPlan) -> Tuple[str, tuple]:
+    """
+    Parameterised ranking query. Area is an equality match on the stored value
+    so it can use an index on restaurants(area).
+    """
+    clauses, params = [], []
+    if plan.area is not None:
+        clauses.append("area = %s")
+        params.append(plan.area)
+    if plan.cuisine is not None:
+        clauses.append("cuisine ILIKE %s")
+        params.append(f"%{plan.cuisine}%")
+    if plan.max_cost is not None:
+        clauses.append("cost <= %s")
+        params.append(plan.max_cost)
+    if plan.min_rating is not None:
+        clauses.append("rating >= %s")
+        params.append(plan.min_rating)
+    where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+    order = "rating * LN(votes + 1) DESC" if plan.order == "score" else "rating DESC, votes DESC"
+    sql = f"SELECT name, area, rating, cost FROM restaurants {where}ORDER BY {order} LIMIT %s"
+    return sql, tuple(params) + (plan.limit,)
+
+LOOKUP_SQL = "SELECT name, area, rating, cost, url FROM restaurants WHERE name = %s AND area = %s LIMIT 1"
+
+def compile_lookup(text: str) -> Optional[Tuple[str, tuple]]:
+    """
+    Exact lookup for a SPECIFIC question that names a known restaurant.
+    """
+    index = get_index()
+    if not index: return None
+    found = index.find_in_text(text)
+    if not found: return None
+    entry = index.entries[found[0]]
+    return LOOKUP_SQL, (entry["name"], entry["area"])
@@ -1,96 +1,212 @@
 import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
-import requests
-from langchain_groq import ChatGroq
+import json
+import asyncio
+import psycopg
+from typing import List
 from dotenv import load_dotenv
 
+from . import db
+from .. import telemetry, limits
+from .cache import TTLCache
+from .suggest_index import get_index, normalize
+from .query_planner import plan_query, compile_stats, compile_lookup
+from .leaderboards import leaderboards
+from .catalog import get_catalog
+from .vector_search import vector_search, row_key
+from .geo_index import coordinates_for, search_near
+
 load_dotenv()
 
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
+SQL_CACHE_TTL = float(os.environ.get("SQL_CACHE_TTL", 3600))
+LOOKUP_CACHE_TTL = float(os.environ.get("LOOKUP_CACHE_TTL", 300))
+# Questions per batched Text-to-SQL call.
+SQL_BATCH_SIZE = int(os.environ.get("SQL_BATCH_SIZE", 20))
 
-def get_llm():
-    return ChatGroq(model="llama-3.3-70b-versatile", api_key=GROQ_API_KEY)
+_llm = None
 
-def get_db_connection():
-    try:
-        return psycopg2.connect(SUPABASE_URL, cursor_factory=RealDictCursor)
-    except Exception as e:
-        print(f"❌ DB Error: {e}")
-        return None
+def get_llm():
+    """
+    One client for the whole process, so its HTTP connections are reused.
+    langchain_groq is imported here rather than at module load: it's slow.
+    """
+    global _llm
+    if _llm is None:
+        from langchain_groq import ChatGroq
+        _llm = ChatGroq(model="llama-3.3-70b-versatile", api_key=GROQ_API_KEY)
+    return _llm
 
-def get_coordinates(address: str):
-    if not GOOGLE_API_KEY: return None
-    try:
-        url = "https://maps.googleapis.com/maps/api/geocode/json"
-        response = requests.get(url, params={"address": address, "key": GOOGLE_API_KEY})
-        if response.json()['status'] == 'OK':
-            loc = response.json()['results'][0]['geometry']['location']
-            return {"lat": loc['lat'], "lng": loc['lng']}
-    except: return None
+# Fixed queries, sent as server-side prepared statements.
+SUGGEST_SQL = "SELECT name, area FROM restaurants WHERE name ILIKE %s LIMIT %s"
+FUZZY_SQL = """
+    SELECT name, area, cuisine, rating, 
+           similarity(name, %s) as sim_score
+    FROM restaurants 
+    WHERE name %% %s 
+       OR cuisine ILIKE %s 
+       OR area ILIKE %s
+    ORDER BY sim_score DESC, rating DESC
+    LIMIT 4
+"""
+FUZZY_FALLBACK_SQL = "SELECT name, area, cuisine, rating FROM restaurants WHERE name ILIKE %s OR cuisine ILIKE %s OR area ILIKE %s ORDER BY rating DESC LIMIT 4"
+LOOKUPS_SQL = "SELECT name, area, rating, cost, url FROM restaurants WHERE name = ANY(%s)"
 
-# --- TOOL 1: SPECIFIC LOOKUP ---
-def run_sql_check(user_query: str):
-    llm = get_llm()
-    system_prompt = """
+# Text-to-SQL system prompt per intent.
+SQL_PROMPTS = {
+    "SPECIFIC": """
     You are a Postgres Expert. Table: restaurants.
     Schema: name, area, rating, cost, url.
     Rules: SELECT name, area, rating, cost, url FROM restaurants. Use ILIKE. LIMIT 1. Raw SQL only.
+    """,
+    "STATS": "Select name, area, rating, cost FROM restaurants. Use ILIKE. ORDER BY rating DESC. LIMIT 5. Raw SQL.",
+}
+BATCH_SQL_RULES = "\nYou get several numbered questions. Return ONLY a JSON list with one SQL string per question, in the same order."
+
+# Generated SQL per (intent, normalized question); catalog rows per (name, area).
+sql_cache = TTLCache(SQL_CACHE_TTL)
+lookup_cache = TTLCache(LOOKUP_CACHE_TTL, maxsize=4096)
+
+def _clean_sql(text: str) -> str:
+    return text.replace("```sql", "").replace("```", "").strip()
+
+async def _text_to_sql(kind: str, user_query: str) -> str:
+    key = f"{kind}:{normalize(user_query)}"
+    if sql := sql_cache.get(key): return sql
+    llm = get_llm()
+    with telemetry.span("text_to_sql", "llm"):
+        async with limits.upstream("groq"):
+            response = await llm.ainvoke([("system", SQL_PROMPTS[kind]), ("human", user_query)])
+    telemetry.record_tokens(response, "text_to_sql")
+    sql = _clean_sql(response.content)
+    sql_cache.set(key, sql)
+    return sql
+
+def needs_text_to_sql(intent: str, user_query: str) -> bool:
+    """
+    True when this question would reach the LLM rather than compiled SQL.
+    """
+    if intent == "SPECIFIC": return compile_lookup(user_query) is None
+    if intent == "STATS": return not plan_query(user_query).has_filters()
+    return False
+
+async def prepare_sql(kind: str, queries: List[str]) -> int:
+    """
+    Generates SQL for many questions with one LLM call per SQL_BATCH_SIZE,
+    into the cache _text_to_sql reads. A chunk whose answer doesn't parse
+    is skipped; those questions get their own call later.
+    """
+    pending = list(dict.fromkeys(q for q in queries if f"{kind}:{normalize(q)}" not in sql_cache))
+    done = 0
+    for i in range(0, len(pending), SQL_BATCH_SIZE):
+        chunk = pending[i:i + SQL_BATCH_SIZE]
+        numbered = "\n".join(f"{n}. {q}" for n, q in enumerate(chunk, 1))
+        try:
+            with telemetry.span("text_to_sql_batch", "llm"):
+                async with limits.upstream("groq"):
+                    response = await get_llm().ainvoke([("system", SQL_PROMPTS[kind] + BATCH_SQL_RULES), ("human", numbered)])
+            telemetry.record_tokens(response, "text_to_sql_batch")
+            sqls = json.loads(response.content.replace("```json", "").replace("```", "").strip())
+            if not isinstance(sqls, list) or len(sqls) != len(chunk): raise ValueError(f"expected {len(chunk)} queries")
+        except Exception as e:
+            print(f"⚠️ Batched Text-to-SQL failed ({e}), falling back to one call per question")
+            continue
+        for q, sql in zip(chunk, sqls):
+            sql_cache.set(f"{kind}:{normalize(q)}", _clean_sql(str(sql)))
+        done += len(chunk)
+    return done
+
+def _lookup_key(name: str, area: str) -> str:
+    return f"{name}\x00{area}"
+
+async def prepare_lookups(queries: List[str]) -> int:
     """
+    Fetches the catalog rows for every named-restaurant question in one
+    query, into the cache run_sql_check reads before going to Postgres.
+    Rows the in-memory catalog already holds aren't fetched.
+    """
+    catalog = get_catalog()
+    wanted = {c[1] for q in queries if (c := compile_lookup(q)) and not (catalog and catalog.find(*c[1]))}
+    if not wanted: return 0
     try:
-        response = llm.invoke([("system", system_prompt), ("human", user_query)])
-        sql = response.content.replace("```sql", "").replace("```", "").strip()
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(sql)
-        row = cursor.fetchone()
-        conn.close()
+        rows = await db.fetch_all(LOOKUPS_SQL, (sorted({name for name, _ in wanted}),), prepare=True)
+    except Exception as e:
+        print(f"⚠️ Batched catalog lookup failed: {e}")
+        return 0
+    found = 0
+    for row in rows:
+        if (row["name"], row["area"]) in wanted:
+            lookup_cache.set(_lookup_key(row["name"], row["area"]), dict(row))
+            found += 1
+    return found
+
+# --- TOOL 1: SPECIFIC LOOKUP ---
+async def run_sql_check(user_query: str):
+    try:
+        # Known restaurant name in the query -> exact parameterised lookup, no LLM.
+        if compiled := compile_lookup(user_query):
+            catalog = get_catalog()
+            row = (catalog and catalog.find(*compiled[1])) or lookup_cache.get(_lookup_key(*compiled[1])) \
+                or await db.fetch_one(*compiled, prepare=True)
+        else:
+            row = await db.fetch_one(await _text_to_sql("SPECIFIC", user_query))
         
         if not row: return None, "No specific match found.", None
         
-        coords = get_coordinates(f"{row['name']}, {row['area']}, Mumbai")
+        coords = await coordinates_for(row['name'], row['area'])
         return row.get('url'), str(dict(row)), coords
     except Exception as e:
         return None, str(e), None
 
 # --- TOOL 2: SEMANTIC/FUZZY SEARCH (UPDATED) ---
-def run_semantic_proxy(query: str):
+# Nearby restaurants handed to the vector search as its candidate set.
+GEO_CANDIDATES = 200
+
+def _distance(row: dict) -> str:
+    return f" | {row['distance_km']} km" if row.get("distance_km") is not None else ""
+
+async def run_semantic_proxy(query: str):
     """
-    Uses Postgres Trigrams (Fuzzy Match) if available, falling back to ILIKE.
+    Embedding search over the in-process vector index, filtered by any
+    area/cost/rating in the query. Uses Postgres Trigrams (Fuzzy Match)
+    if the index isn't loaded, falling back to ILIKE.
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # FUZZY SEARCH QUERY
-        # ordering by similarity to find the best typo match
-        sql = """
-        SELECT name, area, cuisine, rating, 
-               similarity(name, %s) as sim_score
-        FROM restaurants 
-        WHERE name % %s 
-           OR cuisine ILIKE %s 
-           OR area ILIKE %s
-        ORDER BY sim_score DESC, rating DESC
-        LIMIT 4
-        """
-        term = query
-        wildcard = f"%{query}%"
-        
-        # We try to execute the fuzzy search
-        try:
-            cursor.execute(sql, (term, term, wildcard, wildcard))
-        except psycopg2.errors.UndefinedFunction:
-            # Fallback if pg_trgm extension is missing
-            conn.rollback()
-            sql_fallback = "SELECT name, area, cuisine, rating FROM restaurants WHERE name ILIKE %s OR cuisine ILIKE %s OR area ILIKE %s ORDER BY rating DESC LIMIT 4"
-            cursor.execute(sql_fallback, (wildcard, wildcard, wildcard))
+        plan = plan_query(query)
+        nearby = within = None
+        if plan.near:
+            # Distance question: only rank what lies inside the radius.
+            nearby = await search_near(plan.near, plan.radius_km, max_cost=plan.max_cost,
+                                       min_rating=plan.min_rating, limit=GEO_CANDIDATES)
+            if nearby == []: return f"No matches found within {plan.radius_km} km of {plan.near}."
+            if nearby: within = {row_key(r["name"], r["area"]) for r in nearby}
+        hits = await vector_search(query, 4, area=plan.area, max_cost=plan.max_cost, min_rating=plan.min_rating, within=within)
+        if hits is None and nearby:
+            hits = nearby[:4]
+        if hits:
+            return "\n".join([f"• {r['name']} ({r['area']}) | {r['cuisine']} | {r['rating']}⭐{_distance(r)}" for r in hits])
+    except Exception as e:
+        print(f"⚠️ Vector search failed ({e}), using trigrams.")
 
-        rows = cursor.fetchall()
-        conn.close()
+    if catalog := get_catalog():
+        # Same ILIKE match as the SQL below, in memory; names with typos go through the trigram index.
+        rows = catalog.rows(catalog.top_k(catalog.matching(query), 4))
+        if not rows and (index := get_index()):
+            rows = [index.entries[i] for i in index.fuzzy(normalize(query), 4)]
+        if not rows: return "No matches found in DB."
+        return "\n".join([f"• {r['name']} ({r['area']}) | {r['cuisine']} | {r['rating']}⭐" for r in rows])
+
+    try:
+        wildcard = f"%{query}%"
+        async with db.connection() as conn:
+            # FUZZY SEARCH QUERY
+            # ordering by similarity to find the best typo match
+            try:
+                cur = await conn.execute(FUZZY_SQL, (query, query, wildcard, wildcard), prepare=True)
+            except psycopg.errors.UndefinedFunction:
+                # Fallback if pg_trgm extension is missing
+                await conn.rollback()
+                cur = await conn.execute(FUZZY_FALLBACK_SQL, (wildcard, wildcard, wildcard), prepare=True)
+            rows = await cur.fetchall()
 
         if not rows: return "No matches found in DB."
         return "\n".join([f"• {r['name']} ({r['area']}) | {r['cuisine']} | {r['rating']}⭐" for r in rows])
@@ -98,38 +214,82 @@ def run_semantic_proxy(query: str):
         return f"Search Error: {e}"
 
 # --- TOOL 3: STATS ---
-def run_sql_stats(user_query: str):
-    llm = get_llm()
-    prompt = "Select name, area, rating, cost FROM restaurants. Use ILIKE. ORDER BY rating DESC. LIMIT 5. Raw SQL."
-    try:
-        resp = llm.invoke([("system", prompt), ("human", user_query)])
-        sql = resp.content.replace("```sql", "").replace("```", "").strip()
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(sql)
-        rows = cur.fetchall()
-        conn.close()
-        return "\n".join([f"• {r['name']} ({r['area']}) - {r['rating']}⭐" for r in rows]) if rows else "No data."
-    except Exception as e: return str(e)
-
-# --- DIRECT LOOKUP ---
-def query_db_for_name_direct(name: str):
+async def run_sql_stats(user_query: str):
+    """
+    Returns (ranking text, coordinates of the top result for the map).
+    """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM restaurants WHERE name ILIKE %s LIMIT 1", (f"%{name}%",))
-        row = cur.fetchone()
-        conn.close()
-        return f"FOUND: {row['name']}" if row else None
-    except: return None
+        # Structured filters compile to parameterised SQL; the LLM only sees what the planner can't parse.
+        plan = plan_query(user_query)
+        note = ""
+        if plan.has_filters():
+            print(f"📐 STATS plan: {plan}")
+            rows = None
+            if plan.near:
+                rows = await search_near(plan.near, plan.radius_km, cuisine=plan.cuisine, max_cost=plan.max_cost,
+                                         min_rating=plan.min_rating, limit=plan.limit, order=plan.order)
+                if rows is None: note = f"(Couldn't place '{plan.near}' on the map; city-wide results.)\n"
+            if rows is None:
+                rows = leaderboards.lookup(plan.area, plan.cuisine, plan.max_cost, plan.min_rating, plan.limit, plan.order)
+            if rows is None and (catalog := get_catalog()):
+                rows = catalog.query(plan.area, plan.cuisine, plan.max_cost, plan.min_rating, plan.limit, plan.order)
+            if rows is None:
+                rows = await db.fetch_all(*compile_stats(plan), prepare=True)
+        else:
+            rows = await db.fetch_all(await _text_to_sql("STATS", user_query))
+        if not rows: return "No data.", None
+        top = dict(rows[0])
+        coords = top.get("coordinates") or (await coordinates_for(top["name"], top["area"]) if "name" in top and "area" in top else None)
+        return note + "\n".join([f"• {r['name']} ({r['area']}) - {r['rating']}⭐{_distance(r)}" for r in rows]), coords
+    except Exception as e: return str(e), None
+
+# --- BATCH NAME RESOLUTION ---
+RESOLVE_SQL = "SELECT name, area, cuisine, rating, cost, votes, url FROM restaurants WHERE name ILIKE ANY(%s) ORDER BY rating DESC"
+
+async def resolve_restaurant_names(names: List[str]):
+    """
+    Matches a batch of free-text names against the catalog and returns full
+    rows with coordinates, in input order. The in-memory index and catalog
+    hold the whole table, so Postgres is only asked (in a single query)
+    when neither is loaded.
+    """
+    names = [str(n) for n in names if n]
+    matched = {}
+    index = get_index()
+    if index:
+        for n in names:
+            if (i := index.resolve(n)) is not None:
+                matched[n] = {k: v for k, v in index.entries[i].items() if k != "coordinates"}
+
+    catalog = get_catalog()
+    if catalog is not None:
+        for n in names:
+            if n not in matched and (row := catalog.find_name_like(n)):
+                matched[n] = row
+
+    # A name neither of them knows isn't in the table: often an LLM-extracted name from the web.
+    if index is None and catalog is None and (pending := [n for n in names if n not in matched]):
+        try:
+            rows = await db.fetch_all(RESOLVE_SQL, ([f"%{n}%" for n in pending],), prepare=True)
+            for n in pending:
+                if row := next((r for r in rows if n.lower() in r["name"].lower()), None):
+                    matched[n] = dict(row)
+        except Exception as e:
+            print(f"❌ Name resolution failed: {e}")
+
+    rows = list({(r["name"], r["area"]): r for r in (matched[n] for n in names if n in matched)}.values())
+    coords = await asyncio.gather(*[coordinates_for(r["name"], r["area"]) for r in rows])
+    return [{**r, "coordinates": c} for r, c in zip(rows, coords)]
 
 # --- SUGGESTIONS ---
-def get_restaurant_suggestions(query: str):
+async def get_restaurant_suggestions(query: str, limit: int = 3):
+    """
+    Served from the in-memory suggestion index; SQL only if it isn't loaded.
+    """
+    if index := get_index():
+        return index.search(query, limit)
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT name, area FROM restaurants WHERE name ILIKE %s LIMIT 3", (f"%{query}%",))
-        rows = cur.fetchall()
-        conn.close()
-        return [{"name": r["name"], "area": r["area"], "coordinates": get_coordinates(f"{r['name']}, {r['area']}, Mumbai")} for r in rows]
+        rows = await db.fetch_all(SUGGEST_SQL, (f"%{query}%", limit), prepare=True)
+        coords = await asyncio.gather(*[coordinates_for(r['name'], r['area']) for r in rows])
+        return [{"name": r["name"], "area": r["area"], "coordinates": c} for r, c in zip(rows, coords)]
     except: return []
\ No newline at end of file
@@ -0,0 +1,226 @@
+import os
+import re
+import math
+import time
+import asyncio
+from bisect import bisect_left
+from collections import Counter
+from typing import Callable, List, Optional
+
+from . import db
+from .geocode import address_for, peek_coordinates
+
+SUGGEST_REFRESH_SECONDS = float(os.environ.get("SUGGEST_REFRESH_SECONDS", 600))
+CATALOG_SQL = "SELECT name, area, cuisine, rating, cost, votes, url, lat, lng FROM restaurants"
+# For tables ingested before lat/lng were stored; coordinates then come from the geocode cache.
+CATALOG_SQL_NO_COORDS = "SELECT name, area, cuisine, rating, cost, votes, url FROM restaurants"
+# Names too generic to count as a mention of one specific restaurant.
+GENERIC_NAMES = {"cafe", "bar", "pizza", "biryani", "bakery", "kitchen", "the bar", "dhaba", "canteen", "bistro", "restaurant"}
+MAX_NAME_WORDS = 6
+
+# Dishes people ask for that map onto a cuisine column value.
+DISH_CUISINES = {
+    "pasta": "Italian", "pizza": "Pizza", "sushi": "Japanese", "ramen": "Japanese",
+    "dimsum": "Chinese", "dim sum": "Chinese", "noodles": "Chinese", "momos": "Momos",
+    "kebab": "Mughlai", "kebabs": "Mughlai", "dosa": "South Indian", "idli": "South Indian",
+    "burger": "Burger", "burgers": "Burger", "coffee": "Cafe", "dessert": "Desserts", "desserts": "Desserts",
+}
+
+def normalize(text: str) -> str:
+    text = re.sub(r"['’]", "", str(text).lower())
+    return " ".join(re.sub(r"[^a-z0-9 ]", " ", text).split())
+
+def trigrams(text: str):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _row_coordinates(row: dict):
+    if row.get("lat") is not None and row.get("lng") is not None:
+        return {"lat": float(row["lat"]), "lng": float(row["lng"])}
+    return peek_coordinates(address_for(row["name"], row["area"]))
+
+class SuggestionIndex:
+    """
+    In-process autocomplete over restaurant names.
+    Prefix matches come from a sorted key list (whole name + every word start);
+    typos fall back to trigram overlap. Ties rank by rating, then votes.
+    """
+    def __init__(self, rows: List[dict]):
+        self.entries = []
+        for r in rows:
+            self.entries.append({
+                "name": r["name"],
+                "area": r["area"],
+                "cuisine": r.get("cuisine"),
+                "rating": float(r.get("rating") or 0),
+                "cost": float(r.get("cost") or 0),
+                "votes": int(r.get("votes") or 0),
+                "url": r.get("url"),
+                "coordinates": _row_coordinates(r),
+            })
+        self.norm = [normalize(e["name"]) for e in self.entries]
+        self.popularity = [e["rating"] * math.log1p(e["votes"]) for e in self.entries]
+
+        keys = []
+        for i, name in enumerate(self.norm):
+            words = name.split()
+            for w in range(len(words)):
+                keys.append((" ".join(words[w:]), i))
+        keys.sort()
+        self.keys = [k for k, _ in keys]
+        self.key_ids = [i for _, i in keys]
+
+        self.areas = {normalize(e["area"]): e["area"] for e in self.entries if e["area"]}
+        self.cuisines = {normalize(c): c.strip() for r in rows for c in str(r.get("cuisine") or "").split(",") if c.strip()}
+
+        # A one-word name that is also a cuisine or dish ("Sushi") is a food, not a mention.
+        foods = GENERIC_NAMES | set(self.cuisines) | set(DISH_CUISINES)
+        self.by_name = {}
+        for i, name in enumerate(self.norm):
+            if len(name) >= 4 and name not in foods:
+                self.by_name.setdefault(name, []).append(i)
+
+        self.grams = {}
+        self.gram_counts = []
+        for i, name in enumerate(self.norm):
+            name_grams = trigrams(name)
+            self.gram_counts.append(len(name_grams))
+            for g in name_grams:
+                self.grams.setdefault(g, []).append(i)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _rank_key(self, i: int):
+        e = self.entries[i]
+        return (-e["rating"], -e["votes"])
+
+    def prefix(self, q: str, limit: int) -> List[int]:
+        start = bisect_left(self.keys, q)
+        starts_name, starts_word = [], []
+        seen = set()
+        for pos in range(start, len(self.keys)):
+            if not self.keys[pos].startswith(q): break
+            i = self.key_ids[pos]
+            if i in seen: continue
+            seen.add(i)
+            (starts_name if self.norm[i].startswith(q) else starts_word).append(i)
+        starts_name.sort(key=self._rank_key)
+        starts_word.sort(key=self._rank_key)
+        return (starts_name + starts_word)[:limit]
+
+    def fuzzy(self, q: str, limit: int, min_score: float = 0.3) -> List[int]:
+        q_grams = trigrams(q)
+        counts = Counter()
+        for g in q_grams:
+            counts.update(self.grams.get(g, ()))
+        scored = []
+        for i, shared in counts.items():
+            score = shared / (len(q_grams) + self.gram_counts[i] - shared)
+            if score >= min_score:
+                scored.append((-score, -self.popularity[i], i))
+        scored.sort()
+        return [i for _, _, i in scored[:limit]]
+
+    def find_in_text(self, text: str) -> List[int]:
+        """
+        Restaurants whose full name appears in the text, longest mention first.
+        """
+        words = normalize(text).split()
+        found = []
+        for n in range(min(MAX_NAME_WORDS, len(words)), 0, -1):
+            for w in range(len(words) - n + 1):
+                for i in self.by_name.get(" ".join(words[w:w + n]), ()):
+                    if i not in found: found.append(i)
+        return found
+
+    def resolve(self, name: str, min_score: float = 0.5) -> Optional[int]:
+        """
+        Best catalog entry for a free-text restaurant name: exact mention,
+        then name prefix, then a close trigram match.
+        """
+        if found := self.find_in_text(name): return found[0]
+        q = normalize(name)
+        if not q: return None
+        if (ids := self.prefix(q, 1)) and self.norm[ids[0]].startswith(q): return ids[0]
+        ids = self.fuzzy(q, 1, min_score)
+        return ids[0] if ids else None
+
+    def find_area(self, text: str) -> Optional[str]:
+        """
+        The longest known area mentioned in the text, in its stored spelling.
+        """
+        q = f" {normalize(text)} "
+        hits = [a for norm_a, a in self.areas.items() if f" {norm_a} " in q]
+        return max(hits, key=len) if hits else None
+
+    def find_cuisine(self, text: str) -> Optional[str]:
+        words = normalize(text).split()
+        # Also try singulars so "cafes" finds "Cafe".
+        q = f" {' '.join(words)} {' '.join(w[:-1] for w in words if w.endswith('s'))} "
+        hits = [c for norm_c, c in self.cuisines.items() if f" {norm_c} " in q]
+        return max(hits, key=len) if hits else None
+
+    def search(self, query: str, limit: int = 3) -> List[dict]:
+        q = normalize(query)
+        if not q: return []
+        ids = self.prefix(q, limit)
+        if len(ids) < limit:
+            ids += [i for i in self.fuzzy(q, limit) if i not in ids][:limit - len(ids)]
+        return [
+            {"name": self.entries[i]["name"], "area": self.entries[i]["area"], "coordinates": self.entries[i]["coordinates"]}
+            for i in ids
+        ]
+
+_index: Optional[SuggestionIndex] = None
+_refresh_task: Optional[asyncio.Task] = None
+# Other in-memory structures built from the same rows (e.g. leaderboards).
+_listeners: List[Callable[[List[dict]], None]] = []
+
+def get_index() -> Optional[SuggestionIndex]:
+    return _index
+
+def on_refresh(fn: Callable[[List[dict]], None]):
+    _listeners.append(fn)
+    return fn
+
+async def refresh_index():
+    """
+    Rebuilds the index from the restaurants table and swaps it in.
+    """
+    global _index
+    start = time.perf_counter()
+    try:
+        rows = await db.fetch_all(CATALOG_SQL)
+    except Exception as e:
+        print(f"⚠️ Catalog has no lat/lng columns ({e}), using the geocode cache.")
+        rows = await db.fetch_all(CATALOG_SQL_NO_COORDS)
+    index = await asyncio.to_thread(SuggestionIndex, rows)
+    _index = index
+    for fn in _listeners:
+        await asyncio.to_thread(fn, rows)
+    print(f"✅ Suggestion index loaded: {len(index)} restaurants in {time.perf_counter() - start:.2f}s")
+    return index
+
+async def _refresh_loop():
+    while True:
+        await asyncio.sleep(SUGGEST_REFRESH_SECONDS)
+        try:
+            await refresh_index()
+        except Exception as e:
+            print(f"❌ Suggestion index refresh failed: {e}")
+
+async def start_index():
+    global _refresh_task
+    try:
+        await refresh_index()
+    except Exception as e:
+        print(f"❌ Suggestion index load failed: {e}")
+    if _refresh_task is None:
+        _refresh_task = asyncio.create_task(_refresh_loop())
+
+async def stop_index():
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        _refresh_task = None
@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from .suggest_index import normalize
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+VECTOR_INDEX_PATH = os.environ.get("VECTOR_INDEX_PATH", str(DATA_DIR / "embeddings.npy"))
+VECTOR_META_PATH = os.environ.get("VECTOR_META_PATH", str(DATA_DIR / "embeddings_meta.json"))
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+def get_embedder():
+    """
+    Same CPU-only MiniLM (ONNX) model ingest uses for the document vectors.
+    Returns None if chromadb isn't installed.
+    """
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            try:
+                from chromadb.utils import embedding_functions
+                _embedder = embedding_functions.DefaultEmbeddingFunction()
+            except ImportError:
+                print("⚠️ chromadb not installed, vector search disabled.")
+                return None
+    return _embedder
+
+def embed(texts: List[str]) -> np.ndarray:
+    vecs = np.asarray(get_embedder()(texts), dtype=np.float32)
+    return vecs / np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+
+def row_key(name: str, area: str) -> str:
+    return f"{normalize(name)}|{normalize(area)}"
+
+class VectorIndex:
+    """
+    Restaurant embeddings as one contiguous (N, D) float32 matrix, memory-mapped
+    from the file ingest writes, with metadata columns alongside for filtering.
+    Rows are L2-normalized, so a dot product is cosine similarity.
+    """
+    def __init__(self, matrix: np.ndarray, meta: dict):
+        self.matrix = matrix
+        self.names = meta["name"]
+        self.areas = meta["area"]
+        self.cuisines = meta["cuisine"]
+        self.area_keys = np.array([normalize(a) for a in meta["area"]])
+        self.row_keys = np.array([f"{normalize(n)}|{a}" for n, a in zip(meta["name"], self.area_keys)])
+        self.rating = np.asarray(meta["rating"], dtype=np.float64)
+        self.cost = np.asarray(meta["cost"], dtype=np.float64)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def _mask(self, area: Optional[str], max_cost: Optional[float], min_rating: Optional[float], within: Optional[set] = None):
+        mask = np.ones(len(self), dtype=bool)
+        if within is not None: mask &= np.isin(self.row_keys, list(within))
+        if area: mask &= self.area_keys == normalize(area)
+        if max_cost is not None: mask &= self.cost <= max_cost
+        if min_rating is not None: mask &= self.rating >= min_rating
+        return mask
+
+    def search_vectors(self, queries: np.ndarray, k: int = 4, area: Optional[str] = None,
+                       max_cost: Optional[float] = None, min_rating: Optional[float] = None,
+                       within: Optional[set] = None) -> List[List[dict]]:
+        """
+        Batched cosine top-k: one (N, D) x (D, Q) product for all queries.
+        within restricts results to "name|area" keys (see row_key), e.g. a geo search.
+        """
+        scores = self.matrix @ queries.T
+        mask = self._mask(area, max_cost, min_rating, within)
+        scores[~mask] = -np.inf
+        k = min(k, int(mask.sum()))
+        if k == 0: return [[] for _ in range(queries.shape[0])]
+        results = []
+        for col in scores.T:
+            top = np.argpartition(-col, k - 1)[:k]
+            top = top[np.argsort(-col[top])]
+            results.append([{
+                "name": self.names[i], "area": self.areas[i], "cuisine": self.cuisines[i],
+                "rating": float(self.rating[i]), "cost": float(self.cost[i]), "score": round(float(col[i]), 4),
+            } for i in top])
+        return results
+
+    def search(self, query: str, k: int = 4, **filters) -> List[dict]:
+        return self.search_vectors(embed([query]), k, **filters)[0]
+
+_index: Optional[VectorIndex] = None
+
+def get_index() -> Optional[VectorIndex]:
+    return _index
+
+def load_index() -> Optional[VectorIndex]:
+    global _index
+    if not (os.path.exists(VECTOR_INDEX_PATH) and os.path.exists(VECTOR_META_PATH)):
+        print(f"⚠️ No vector index at {VECTOR_INDEX_PATH}, vibe search will use trigrams.")
+        return None
+    if get_embedder() is None: return None
+    start = time.perf_counter()
+    matrix = np.load(VECTOR_INDEX_PATH, mmap_mode="r")
+    with open(VECTOR_META_PATH) as f:
+        meta = json.load(f)
+    _index = VectorIndex(matrix, meta)
+    # Load the model now so the first query doesn't pay for it.
+    embed(["warm up"])
+    print(f"✅ Vector index loaded: {len(_index)} x {matrix.shape[1]} in {time.perf_counter() - start:.2f}s")
+    return _index
+
+async def vector_search(query: str, k: int = 4, **filters) -> Optional[List[dict]]:
+    """
+    None when the index isn't loaded, so callers can fall back.
+    """
+    index = _index
+    if index is None: return None
+    return await asyncio.to_thread(index.search, query, k, **filters)
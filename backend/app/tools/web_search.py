@@ -1,38 +1,204 @@
 import os
+import time
+import asyncio
+from collections import deque
+from typing import Dict, List
 from dotenv import load_dotenv
-# --- REVERTED IMPORT ---
-from langchain_community.tools.tavily_search import TavilySearchResults
-from langchain_community.tools import DuckDuckGoSearchRun
+
+from .cache import TTLCache, SingleFlight, cached_call
+from .suggest_index import normalize
+from .. import telemetry, limits
 
 load_dotenv()
 
-def run_web_check(user_query: str):
-    """
-    Step 3: General Web Search (Reddit/Blogs) with Fallback
-    """
-    tavily_key = os.environ.get("TAVILY_API_KEY")
-    
-    # Priority 1: Tavily
-    if tavily_key:
-        try:
-            print(f"DEBUG: Running Tavily Search for {user_query}...")
-            tool = TavilySearchResults(max_results=3)
-            results = tool.invoke({"query": f"{user_query} reviews reddit mumbai"})
-            
-            if isinstance(results, list):
-                formatted = [f"- {res.get('content', 'No content')} ({res.get('url', 'No URL')})" for res in results]
-                return "\n".join(formatted)
-            else:
-                return str(results)
-                
-        except Exception as e:
-            print(f"WARNING: Tavily failed ({e}). Switching to DuckDuckGo.")
-    
-    # Priority 2: DuckDuckGo (Fallback)
+WEB_CACHE_TTL = float(os.environ.get("WEB_CACHE_TTL", 3600))
+# Seconds to wait on the first provider before racing the second. Unset: the first provider's p90.
+WEB_HEDGE_DELAY = os.environ.get("WEB_HEDGE_DELAY")
+WEB_HEDGE_MIN_DELAY = float(os.environ.get("WEB_HEDGE_MIN_DELAY", 0.3))
+WEB_HEDGE_MAX_DELAY = float(os.environ.get("WEB_HEDGE_MAX_DELAY", 4))
+WEB_MAX_RESULTS = 3
+LATENCY_WINDOW = 200
+# A demoted provider's error rate halves every this many idle seconds, so it gets retried.
+ERROR_HALF_LIFE = float(os.environ.get("WEB_ERROR_HALF_LIFE", 300))
+
+# Clients are built once and reused across requests. langchain_community is
+# imported when they're built (first use or warm-up), not at module load.
+_tavily = None
+_ddg = None
+web_cache = TTLCache(WEB_CACHE_TTL)
+_flight = SingleFlight()
+
+def get_tavily():
+    global _tavily
+    if _tavily is None:
+        from langchain_community.tools.tavily_search import TavilySearchResults
+        _tavily = TavilySearchResults(max_results=WEB_MAX_RESULTS)
+    return _tavily
+
+def get_ddg():
+    global _ddg
+    if _ddg is None:
+        from langchain_community.tools import DuckDuckGoSearchResults
+        _ddg = DuckDuckGoSearchResults(max_results=WEB_MAX_RESULTS, output_format="list")
+    return _ddg
+
+def _normalize(provider: str, raw) -> List[dict]:
+    """
+    One shape for every provider: [{"title", "snippet", "url", "source"}].
+    """
+    if isinstance(raw, str):
+        return [{"title": "", "snippet": raw.strip(), "url": None, "source": provider}] if raw.strip() else []
+    results = []
+    for r in raw or []:
+        if not isinstance(r, dict): continue
+        snippet = (r.get("content") or r.get("snippet") or r.get("body") or "").strip()
+        if snippet:
+            results.append({
+                "title": r.get("title") or "", "snippet": snippet,
+                "url": r.get("url") or r.get("link") or r.get("href"), "source": provider,
+            })
+    return results
+
+class Provider:
+    """
+    One search backend plus its recent latency and error history, which
+    decide the provider order and how long to wait before hedging.
+    """
+    def __init__(self, name: str, query_for, client, default_latency: float):
+        self.name = name
+        self.query_for = query_for
+        self.client = client
+        self.latencies = deque([default_latency], maxlen=LATENCY_WINDOW)
+        self.error_rate = 0.0
+        self.calls = 0
+        self.last_call = time.monotonic()
+
+    def available(self) -> bool:
+        return self.name != "tavily" or bool(os.environ.get("TAVILY_API_KEY"))
+
+    def quantile(self, q: float) -> float:
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def cost(self) -> float:
+        """
+        Expected seconds to a usable answer: median latency, inflated by the error rate.
+        """
+        return self.quantile(0.5) / max(1 - self.current_error_rate(), 0.05)
+
+    def current_error_rate(self) -> float:
+        return self.error_rate * 0.5 ** ((time.monotonic() - self.last_call) / ERROR_HALF_LIFE)
+
+    def record(self, seconds: float, ok: bool):
+        self.calls += 1
+        self.last_call = time.monotonic()
+        self.latencies.append(seconds)
+        self.error_rate = 0.9 * self.error_rate + 0.1 * (0 if ok else 1)
+
+    async def search(self, user_query: str) -> List[dict]:
+        # No token means "try the other provider", not a provider failure.
+        async with limits.upstream(self.name, timeout=0):
+            start = time.perf_counter()
+            try:
+                with telemetry.span(self.name, "upstream"):
+                    raw = await asyncio.to_thread(self.client().invoke, self.query_for(user_query))
+                results = _normalize(self.name, raw)
+            except asyncio.CancelledError:
+                # Lost the race: the time so far is still a lower bound on its latency.
+                self.latencies.append(time.perf_counter() - start)
+                raise
+            except Exception:
+                self.record(time.perf_counter() - start, ok=False)
+                telemetry.inc("munchy_upstream_errors_total", upstream=self.name)
+                raise
+            self.record(time.perf_counter() - start, ok=bool(results))
+        if not results: raise RuntimeError(f"{self.name} returned no results")
+        return results
+
+PROVIDERS = [
+    Provider("tavily", lambda q: {"query": f"{q} reviews reddit mumbai"}, lambda: get_tavily(), 1.0),
+    Provider("duckduckgo", lambda q: f"site:reddit.com/r/mumbai {q} review", lambda: get_ddg(), 1.5),
+]
+
+def ranked() -> List[Provider]:
+    return sorted((p for p in PROVIDERS if p.available()), key=lambda p: p.cost())
+
+def hedge_delay(primary: Provider) -> float:
+    if WEB_HEDGE_DELAY is not None: return float(WEB_HEDGE_DELAY)
+    return min(max(primary.quantile(0.9), WEB_HEDGE_MIN_DELAY), WEB_HEDGE_MAX_DELAY)
+
+async def _search(user_query: str) -> dict:
+    """
+    Asks the cheapest provider first. If it hasn't answered within the hedge
+    delay (or fails), the next one starts too; the first good answer wins
+    and the rest are cancelled.
+    Returns {"provider", "results"} or {"provider": None, "results": [], "error"}.
+    """
+    queue = ranked()
+    tasks: Dict[asyncio.Task, Provider] = {}
+    errors = []
+
+    def launch():
+        p = queue.pop(0)
+        print(f"DEBUG: Running {p.name} search for {user_query}...")
+        tasks[asyncio.create_task(p.search(user_query))] = p
+
+    launch()
     try:
-        print(f"DEBUG: Running DuckDuckGo Search for {user_query}...")
-        ddg = DuckDuckGoSearchRun()
-        query = f"site:reddit.com/r/mumbai {user_query} review"
-        return ddg.invoke(query)
-    except Exception as e:
-        return f"Web Search Error (Both providers failed): {str(e)}"
\ No newline at end of file
+        while tasks:
+            delay = hedge_delay(tasks[next(iter(tasks))]) if queue else None
+            done, _ = await asyncio.wait(tasks, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                telemetry.inc("munchy_web_hedges_total", provider=queue[0].name)
+                launch()
+                continue
+            for task in done:
+                p = tasks.pop(task)
+                if task.exception() is None:
+                    telemetry.inc("munchy_web_wins_total", provider=p.name)
+                    return {"provider": p.name, "results": task.result()}
+                print(f"WARNING: {p.name} failed ({task.exception()}).")
+                errors.append(f"{p.name}: {task.exception()}")
+            # Everything in flight failed: bring in the next provider right away.
+            if not tasks and queue:
+                telemetry.inc("munchy_upstream_fallbacks_total", primary=errors[-1].split(":")[0], fallback=queue[0].name)
+                launch()
+    finally:
+        for task in tasks: task.cancel()
+    return {"provider": None, "results": [], "error": "; ".join(errors) or "no provider available"}
+
+def format_results(found: dict) -> str:
+    """
+    The text the agent nodes put into web_data: one "- snippet (url)" line per result.
+    """
+    if not found["results"]:
+        return f"Web Search Error (Both providers failed): {found.get('error')}"
+    return "\n".join(f"- {r['snippet']} ({r['url'] or 'No URL'})" for r in found["results"])
+
+def is_cached(user_query: str) -> bool:
+    return normalize(user_query) in web_cache
+
+async def search_web(user_query: str) -> dict:
+    """
+    Structured, hedged web search. Results are cached per normalized query,
+    and concurrent requests for the same query share one upstream call.
+    """
+    return await cached_call(
+        web_cache, _flight, normalize(user_query), lambda: _search(user_query),
+        cacheable=lambda r: bool(r["results"]),
+    )
+
+async def run_web_check(user_query: str):
+    """
+    Step 3: General Web Search (Reddit/Blogs), raced across providers.
+    """
+    return format_results(await search_web(user_query))
+
+def provider_stats():
+    return {
+        "order": [p.name for p in ranked()],
+        "providers": {p.name: {
+            "calls": p.calls, "error_rate": round(p.current_error_rate(), 3),
+            "p50_s": round(p.quantile(0.5), 3), "p90_s": round(p.quantile(0.9), 3),
+        } for p in PROVIDERS},
+    }
@@ -1,37 +1,68 @@
 import os
-from googleapiclient.discovery import build
+import asyncio
+import threading
 from dotenv import load_dotenv
 
+from .cache import TTLCache, SingleFlight, cached_call
+from .suggest_index import normalize
+from .. import telemetry, limits
+
 load_dotenv()
 
-def search_youtube_reviews(query: str):
+YOUTUBE_CACHE_TTL = float(os.environ.get("YOUTUBE_CACHE_TTL", 6 * 3600))
+
+# googleapiclient services aren't thread-safe, so each worker thread builds one and keeps it.
+_local = threading.local()
+youtube_cache = TTLCache(YOUTUBE_CACHE_TTL)
+_flight = SingleFlight()
+
+def get_youtube(api_key: str):
+    if getattr(_local, "youtube", None) is None:
+        from googleapiclient.discovery import build
+        _local.youtube = build('youtube', 'v3', developerKey=api_key, cache_discovery=False)
+    return _local.youtube
+
+def _search(query: str, api_key: str):
+    youtube = get_youtube(api_key)
+    
+    request = youtube.search().list(
+        part="snippet",
+        maxResults=3,
+        q=f"{query} food review mumbai",
+        type="video"
+    )
+    response = request.execute()
+    
+    videos = []
+    for item in response.get('items', []):
+        title = item['snippet']['title']
+        video_id = item['id']['videoId']
+        url = f"https://www.youtube.com/watch?v={video_id}"
+        videos.append(f"🎥 {title} - {url}")
+        
+    return "\n".join(videos) if videos else "No video reviews found."
+
+async def search_youtube_reviews(query: str):
     """
     Searches YouTube for video reviews using the official API.
+    Cached per normalized query; concurrent identical searches share one call.
     """
     api_key = os.environ.get("YOUTUBE_API_KEY")
     
     if not api_key:
         return "YouTube API Key is missing in .env."
 
-    try:
-        youtube = build('youtube', 'v3', developerKey=api_key)
-        
-        request = youtube.search().list(
-            part="snippet",
-            maxResults=3,
-            q=f"{query} food review mumbai",
-            type="video"
-        )
-        response = request.execute()
-        
-        videos = []
-        for item in response.get('items', []):
-            title = item['snippet']['title']
-            video_id = item['id']['videoId']
-            url = f"https://www.youtube.com/watch?v={video_id}"
-            videos.append(f"🎥 {title} - {url}")
-            
-        return "\n".join(videos) if videos else "No video reviews found."
-        
-    except Exception as e:
-        return f"YouTube API Error: {str(e)}"
\ No newline at end of file
+    async def fetch():
+        try:
+            # Enrichment: with no token to spare, skip rather than queue.
+            async with limits.upstream("youtube", timeout=0):
+                with telemetry.span("youtube", "upstream"):
+                    return await asyncio.to_thread(_search, query, api_key)
+        except Exception as e:
+            telemetry.inc("munchy_upstream_errors_total", upstream="youtube")
+            return f"YouTube API Error: {str(e)}"
+
+    return await cached_call(
+        youtube_cache, _flight, normalize(query), fetch,
+        cacheable=lambda r: not r.startswith("YouTube API Error"),
+    )
@@ -0,0 +1,93 @@
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+
+from . import telemetry
+
+# Seconds spent importing the app's modules (set by main before anything else runs).
+_import_seconds: Optional[float] = None
+_phases: Dict[str, dict] = {}
+_state = {"status": "starting", "started": None, "finished": None}
+_ready: Optional[asyncio.Event] = None
+_task: Optional[asyncio.Task] = None
+
+def record_import(seconds: float):
+    global _import_seconds
+    _import_seconds = seconds
+    print(f"📦 App modules imported in {seconds:.2f}s")
+
+def _event() -> asyncio.Event:
+    # Created lazily so it binds to the running loop.
+    global _ready
+    if _ready is None: _ready = asyncio.Event()
+    return _ready
+
+async def phase(name: str, fn: Callable[[], Awaitable]):
+    """
+    Runs one warm-up step and records how long it took. A failed step is
+    logged and left for first use to retry; it doesn't block readiness.
+    """
+    start = time.perf_counter()
+    try:
+        await fn()
+        _phases[name] = {"ok": True}
+    except Exception as e:
+        print(f"⚠️ Warm-up '{name}' failed: {e}")
+        _phases[name] = {"ok": False, "error": str(e)}
+    _phases[name]["seconds"] = round(time.perf_counter() - start, 3)
+
+async def _run(groups):
+    _state["status"] = "warming"
+    _state["started"] = time.perf_counter()
+    try:
+        # Groups run concurrently; the phases inside a group run in order.
+        async def chain(steps):
+            for name, fn in steps: await phase(name, fn)
+        await asyncio.gather(*(chain(steps) for steps in groups))
+    finally:
+        _state["finished"] = time.perf_counter()
+        _state["status"] = "ready"
+        _event().set()
+        print(f"✅ Warm-up finished in {_state['finished'] - _state['started']:.2f}s")
+
+def start(groups):
+    """
+    Starts warm-up in the background so the port binds straight away.
+    groups: lists of (name, async fn) steps.
+    """
+    global _task
+    if _task is None: _task = asyncio.create_task(_run(groups))
+    return _task
+
+async def stop():
+    global _task
+    if _task is not None and not _task.done():
+        _task.cancel()
+    _task = None
+
+def ready() -> bool:
+    return _state["status"] == "ready"
+
+async def wait_ready():
+    if not ready(): await _event().wait()
+
+def warmup_stats():
+    total = None
+    if _state["started"] is not None:
+        total = round((_state["finished"] or time.perf_counter()) - _state["started"], 3)
+    return {
+        "status": _state["status"],
+        "import_s": round(_import_seconds, 3) if _import_seconds is not None else None,
+        "warmup_s": total,
+        "phases": dict(_phases),
+    }
+
+@telemetry.register_gauges
+def _startup_gauges():
+    stats = warmup_stats()
+    gauges = {"munchy_ready": 1 if ready() else 0}
+    if stats["import_s"] is not None: gauges["munchy_import_seconds"] = stats["import_s"]
+    if stats["warmup_s"] is not None: gauges["munchy_warmup_seconds"] = stats["warmup_s"]
+    for name, p in stats["phases"].items():
+        gauges[f"munchy_warmup_{name}_seconds"] = p["seconds"]
+    return gauges
@@ -0,0 +1,157 @@
+"""
+Offline throughput benchmark for /chat and /suggest.
+
+    cd backend && python -m bench.run --concurrency 1,8,32 --requests 200
+
+Every upstream is replaced by the stand-ins in bench/stubs.py, so this needs
+no network or API keys (only the backend requirements plus httpx). Reports
+throughput, latency percentiles per endpoint and intent, and a per-node /
+per-tool breakdown taken from the spans each /chat response returns.
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import defaultdict
+from typing import Dict, List
+
+from .stubs import DEFAULT_LATENCY, Latency, install
+
+# Share of /chat traffic per intent, and how much /suggest traffic rides alongside it.
+MIX = {"GENERAL": 0.1, "SPECIFIC": 0.3, "STATS": 0.3, "DISCOVERY": 0.3}
+SUGGEST_SHARE = 0.5
+
+def build_workload(restaurants, n: int, seed: int = 1) -> List[dict]:
+    rng = random.Random(seed)
+    rows = [dict(r) for r in restaurants.execute("SELECT name, area, cuisine FROM restaurants")]
+    areas = sorted({r["area"] for r in rows if r["area"]})
+    cuisines = sorted({c.strip() for r in rows for c in str(r["cuisine"] or "").split(",") if c.strip()})
+    templates = {
+        "GENERAL": lambda: rng.choice(["Hi!", "hello there", "who are you?", "write python code for me"]),
+        "SPECIFIC": lambda: f"{rng.choice(['rating of', 'cost of', 'how is'])} {rng.choice(rows)['name']}",
+        "STATS": lambda: rng.choice([
+            f"top {rng.randint(3, 10)} {rng.choice(cuisines)} in {rng.choice(areas)}",
+            f"best {rng.choice(cuisines)} under {rng.choice([500, 800, 1500])}",
+            f"highest rated places in {rng.choice(areas)}",
+            f"top {rng.choice(cuisines)} within {rng.choice([1, 2, 3])} km of {rng.choice(areas)}",
+        ]),
+        "DISCOVERY": lambda: rng.choice([
+            "quiet date spot with good wine", "where can i get great ramen", "cozy cafe to work from",
+            f"rooftop vibes near {rng.choice(areas)}", "craving authentic biryani",
+        ]),
+    }
+    work = []
+    for _ in range(n):
+        if rng.random() < SUGGEST_SHARE:
+            name = rng.choice(rows)["name"]
+            work.append({"endpoint": "/suggest", "intent": "SUGGEST", "body": {"query": name[:rng.randint(2, 6)], "limit": 5}})
+        intent = rng.choices(list(MIX), weights=list(MIX.values()))[0]
+        work.append({"endpoint": "/chat", "intent": intent, "body": {"query": templates[intent](), "session_id": "default", "chat_history": []}})
+    return work
+
+def pct(values: List[float], q: float) -> float:
+    if not values: return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "n": len(values),
+        "p50_ms": round(pct(values, 0.5) * 1000, 1),
+        "p95_ms": round(pct(values, 0.95) * 1000, 1),
+        "p99_ms": round(pct(values, 0.99) * 1000, 1),
+    }
+
+async def run_level(client, work: List[dict], concurrency: int) -> dict:
+    queue = asyncio.Queue()
+    for item in work: queue.put_nowait(item)
+    latencies = defaultdict(list)
+    spans = defaultdict(list)
+    errors = shed = 0
+
+    async def worker():
+        nonlocal errors, shed
+        while not queue.empty():
+            item = queue.get_nowait()
+            start = time.perf_counter()
+            resp = await client.post(item["endpoint"], json=item["body"])
+            elapsed = time.perf_counter() - start
+            if resp.status_code == 503:
+                shed += 1
+                continue
+            if resp.status_code != 200:
+                errors += 1
+                continue
+            latencies[item["endpoint"]].append(elapsed)
+            if item["endpoint"] == "/chat":
+                data = resp.json()
+                latencies[f"/chat [{data.get('intent') or item['intent']}]"].append(elapsed)
+                for s in data.get("metrics", {}).get("spans", []):
+                    spans[f"{s['kind']}:{s['name']}"].append(s["ms"] / 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    wall = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": len(work),
+        "errors": errors,
+        "shed": shed,
+        "wall_s": round(wall, 2),
+        "throughput_rps": round((len(work) - errors - shed) / wall, 2),
+        "latency": {k: summarize(v) for k, v in sorted(latencies.items())},
+        "spans": {k: summarize(v) for k, v in sorted(spans.items())},
+    }
+
+def print_report(result: dict):
+    print(f"\n=== concurrency {result['concurrency']}: {result['throughput_rps']} req/s "
+          f"({result['requests']} requests, {result['errors']} errors, {result['shed']} shed, {result['wall_s']}s) ===")
+    a = result.get("admission") or {}
+    if a.get("degraded"):
+        print(f"admission: {a['degraded']} degraded (cumulative)")
+    p = result.get("prefetch") or {}
+    if p.get("started"):
+        print(f"prefetch: {p['started']} started, hit rate {p['hit_rate']}, waste rate {p['waste_rate']} (cumulative)")
+    for title, table in (("endpoint", result["latency"]), ("node / tool", result["spans"])):
+        print(f"{title:<34}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for key, s in table.items():
+            print(f"{key:<34}{s['n']:>6}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}")
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="/chat requests per level (plus /suggest traffic)")
+    parser.add_argument("--db", default="data/restaurants.db", help="ingest output; a synthetic table is used if missing")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplies every stand-in latency")
+    parser.add_argument("--caches", action="store_true", help="keep response/web/YouTube caches on")
+    parser.add_argument("--rate-limits", action="store_true", help="keep the per-upstream rate limits on")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    import httpx
+    app, restaurants = install(Latency(DEFAULT_LATENCY, args.latency_scale, args.seed), args.db, args.caches, args.rate_limits)
+    from app import main as api
+    await api.startup()
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for level in [int(c) for c in args.concurrency.split(",")]:
+            work = build_workload(restaurants, args.requests, args.seed)
+            result = await run_level(client, work, level)
+            health = (await client.get("/health")).json()
+            result["prefetch"], result["admission"] = health["prefetch"], health["admission"]
+            print_report(result)
+            results.append(result)
+    await api.shutdown()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,267 @@
+"""
+Local stand-ins for every upstream the API talks to, so the benchmark runs
+with no network: a fake chat model, a SQLite-backed restaurants table in place
+of the Postgres pool, and canned Tavily / DuckDuckGo / YouTube / Geocoding
+responses. Each stand-in sleeps for a latency drawn from a log-normal
+distribution fitted to a (median, p95) pair.
+
+install() must run before anything under app/ is imported, because several
+modules read their config from the environment at import time.
+"""
+import os
+import re
+import json
+import math
+import time
+import random
+import asyncio
+import sqlite3
+import tempfile
+from contextlib import asynccontextmanager
+from typing import Any, List, Optional
+
+# (median_ms, p95_ms) per upstream.
+DEFAULT_LATENCY = {
+    "llm": (600, 1500),
+    "db": (15, 60),
+    "tavily": (900, 2500),
+    "duckduckgo": (1200, 3000),
+    "youtube": (400, 1200),
+    "geocoding": (150, 400),
+}
+
+class Latency:
+    def __init__(self, profile: dict, scale: float = 1.0, seed: Optional[int] = None):
+        self.profile = profile
+        self.scale = scale
+        self.rng = random.Random(seed)
+
+    def sample(self, upstream: str) -> float:
+        median, p95 = self.profile[upstream]
+        sigma = math.log(p95 / median) / 1.645
+        return self.rng.lognormvariate(math.log(median), sigma) * self.scale / 1000
+
+    async def wait(self, upstream: str):
+        await asyncio.sleep(self.sample(upstream))
+
+    def block(self, upstream: str):
+        time.sleep(self.sample(upstream))
+
+# --- RESTAURANTS TABLE ---
+
+def load_restaurants(db_path: Optional[str], n_synthetic: int = 2000) -> sqlite3.Connection:
+    """
+    The ingest output (restaurants.db) if it exists, otherwise a synthetic table
+    with the same columns.
+    """
+    if db_path and os.path.exists(db_path):
+        src = sqlite3.connect(db_path)
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        src.backup(conn)
+        src.close()
+    else:
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        conn.execute("CREATE TABLE restaurants (name TEXT, cuisine TEXT, area TEXT, rating REAL, cost REAL, votes INTEGER, url TEXT, lat REAL, lng REAL)")
+        rng = random.Random(7)
+        areas = {
+            "Bandra West": (19.060, 72.836), "Andheri West": (19.136, 72.827), "Lower Parel": (18.995, 72.830),
+            "Colaba": (18.915, 72.826), "Powai": (19.118, 72.906), "Juhu": (19.100, 72.827), "Malad West": (19.187, 72.836),
+            "Fort": (18.935, 72.836), "Khar": (19.071, 72.837), "Worli": (19.012, 72.818),
+        }
+        cuisines = ["North Indian", "Chinese", "Italian", "Cafe", "Continental", "South Indian", "Japanese", "Desserts", "Seafood", "Mughlai"]
+        words = ["Bombay", "Spice", "Garden", "Tandoor", "Cafe", "House", "Kitchen", "Table", "Social", "Bistro", "Dhaba", "Express", "Royal", "Coastal"]
+        rows = []
+        for i in range(n_synthetic):
+            name = f"{rng.choice(words)} {rng.choice(words)} {i}"
+            area = rng.choice(list(areas))
+            lat, lng = areas[area]
+            rows.append((name, ", ".join(rng.sample(cuisines, 2)), area, round(rng.uniform(2.8, 4.9), 1),
+                         rng.choice([300, 500, 800, 1200, 1800, 2500]), rng.randint(0, 6000), f"https://zomato.com/mumbai/{i}",
+                         lat + rng.gauss(0, 0.006), lng + rng.gauss(0, 0.006)))
+        conn.executemany("INSERT INTO restaurants VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.row_factory = sqlite3.Row
+    conn.create_function("LN", 1, lambda x: math.log(x) if x and x > 0 else 0.0)
+    return conn
+
+def _to_sqlite(sql: str) -> str:
+    sql = re.sub(r"\bILIKE\b", "LIKE", sql, flags=re.I)
+    sql = sql.replace("%%", "\0").replace("%s", "?").replace("\0", "%")
+    return sql
+
+class FakeCursor:
+    def __init__(self, rows: List[dict]):
+        self.rows = rows
+
+    async def fetchall(self):
+        return self.rows
+
+    async def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+class FakeConnection:
+    """
+    Just enough of psycopg's AsyncConnection for tools/db.py and sql_search.py.
+    """
+    def __init__(self, conn: sqlite3.Connection, latency: Latency):
+        self.conn = conn
+        self.latency = latency
+
+    async def execute(self, sql: str, params=None, prepare=None):
+        await self.latency.wait("db")
+        if "similarity(" in sql:
+            # Same path as a Postgres without pg_trgm.
+            import psycopg
+            raise psycopg.errors.UndefinedFunction("function similarity does not exist")
+        params = tuple(params or ())
+        if any(isinstance(p, list) for p in params):
+            # "= ANY(%s)" with a list -> "IN (?, ?, ...)", one placeholder per item.
+            values = next(p for p in params if isinstance(p, list))
+            sql = re.sub(r"=\s*ANY\(%s\)", f"IN ({', '.join(['%s'] * len(values))})", sql)
+            params = tuple(x for p in params for x in (p if isinstance(p, list) else [p]))
+        rows = self.conn.execute(_to_sqlite(sql), params).fetchall()
+        return FakeCursor([dict(r) for r in rows])
+
+    async def rollback(self):
+        pass
+
+# --- CHAT MODEL ---
+
+def _make_chat_model(latency: Latency, restaurants: sqlite3.Connection):
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    names = [r["name"] for r in restaurants.execute("SELECT name FROM restaurants LIMIT 200")]
+
+    def intent(q: str) -> str:
+        q = q.lower() + " "
+        if "top" in q or "best" in q: return "STATS"
+        if "rating of" in q or "cost of" in q: return "SPECIFIC"
+        if "hello" in q or "hi " in q: return "GENERAL"
+        return "DISCOVERY"
+
+    def reply(messages) -> str:
+        text = "\n".join(str(m.content) for m in messages)
+        if "Classify query intent" in text:
+            # Only the user's query, not the examples in the prompt.
+            return intent(re.search(r'Query: "(.*)"', text).group(1))
+        if "Classify each query's intent" in text:
+            return json.dumps([intent(json.loads(q)) for q in re.findall(r'^\s*\d+\. (".*")$', text, re.M)])
+        if "JSON list with one SQL string" in text:
+            questions = re.findall(r"^\d+\. (.*)$", str(messages[-1].content), re.M)
+            return json.dumps(["SELECT name, area, rating, cost FROM restaurants ORDER BY rating DESC LIMIT 5"] * len(questions))
+        if "Postgres Expert" in text:
+            word = str(messages[-1].content).split()[-1].strip("?'.,")
+            return f"SELECT name, area, rating, cost, url FROM restaurants WHERE name ILIKE '%{word}%' LIMIT 1"
+        if "Raw SQL" in text:
+            return "SELECT name, area, rating, cost FROM restaurants ORDER BY rating DESC LIMIT 5"
+        if "Extract top 2 restaurant names" in text:
+            return json.dumps(random.sample(names, 2))
+        return "**Bombay Canteen** (Lower Parel) ⭐ **4.6** | ₹2000\nVerdict 🍛 Worth the trip. Vibe ✨ Lively and bright."
+
+    class FakeChatModel(BaseChatModel):
+        @property
+        def _llm_type(self) -> str:
+            return "bench-fake"
+
+        def _result(self, messages) -> ChatResult:
+            content = reply(messages)
+            prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+            msg = AIMessage(content=content, usage_metadata={
+                "input_tokens": prompt_tokens, "output_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+            })
+            return ChatResult(generations=[ChatGeneration(message=msg)])
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            latency.block("llm")
+            return self._result(messages)
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+            await latency.wait("llm")
+            return self._result(messages)
+
+    return FakeChatModel()
+
+# --- SEARCH / YOUTUBE / GEOCODE ---
+
+class FakeTavily:
+    def __init__(self, latency: Latency, names: List[str]):
+        self.latency = latency
+        self.names = names
+
+    def invoke(self, payload: Any):
+        self.latency.block("tavily")
+        picks = random.sample(self.names, 3)
+        return [{"url": f"https://reddit.com/r/mumbai/{i}", "content": f"Honestly {n} was great, the food and vibe were on point."}
+                for i, n in enumerate(picks)]
+
+class FakeDuckDuckGo:
+    def __init__(self, latency: Latency):
+        self.latency = latency
+
+    def invoke(self, query: str):
+        self.latency.block("duckduckgo")
+        return [{"title": f"r/mumbai: {query}", "snippet": f"Reddit thread about {query}: people recommend trying the local favourites.",
+                 "link": "https://reddit.com/r/mumbai/ddg"}]
+
+def install(latency: Optional[Latency] = None, db_path: Optional[str] = None, caches: bool = False,
+            rate_limits: bool = False):
+    """
+    Points every upstream at a local stand-in and returns the FastAPI app.
+    With caches=False all TTL caches are disabled so each request does full work.
+    With rate_limits=False the per-upstream token buckets are off, so the
+    numbers measure the code rather than the limiter.
+    """
+    latency = latency or Latency(DEFAULT_LATENCY)
+    os.environ.update({
+        "GROQ_API_KEY": "bench", "TAVILY_API_KEY": "bench", "YOUTUBE_API_KEY": "bench",
+        "GOOGLE_API_KEY": "bench", "SUPABASE_URL": "postgresql://bench",
+    })
+    tmp = tempfile.mkdtemp(prefix="munchy-bench-")
+    os.environ.update({"GEOCODE_CACHE_PATH": os.path.join(tmp, "geocode.db"), "SESSION_STORE_PATH": os.path.join(tmp, "sessions.db")})
+    if not caches:
+        os.environ.update({"RESPONSE_CACHE_TTL": "0", "WEB_CACHE_TTL": "0", "YOUTUBE_CACHE_TTL": "0"})
+
+    restaurants = load_restaurants(db_path)
+    names = [r["name"] for r in restaurants.execute("SELECT name FROM restaurants LIMIT 500")]
+
+    from app.tools import db, geocode, web_search, youtube_search, sql_search
+    from app import agent_logic, limits
+    if not rate_limits:
+        for name in limits.buckets: limits.buckets[name] = None
+
+    @asynccontextmanager
+    async def connection():
+        yield FakeConnection(restaurants, latency)
+
+    async def open_pool():
+        return None
+
+    async def close_pool():
+        pass
+
+    db.connection = connection
+    db.open_pool = open_pool
+    db.close_pool = close_pool
+
+    model = _make_chat_model(latency, restaurants)
+    agent_logic.llm = model
+    sql_search.get_llm = lambda: model
+
+    tavily, ddg = FakeTavily(latency, names), FakeDuckDuckGo(latency)
+    web_search.get_tavily = lambda: tavily
+    web_search.get_ddg = lambda: ddg
+
+    def fake_youtube(query: str, api_key: str):
+        latency.block("youtube")
+        return "\n".join(f"🎥 {query} food review #{i} - https://www.youtube.com/watch?v=bench{i}" for i in range(3))
+    youtube_search._search = fake_youtube
+
+    def fake_geocode(address: str):
+        latency.block("geocoding")
+        return {"lat": 19.0 + random.random() * 0.2, "lng": 72.8 + random.random() * 0.1}
+    geocode._fetch_remote = fake_geocode
+
+    from app.main import app
+    return app, restaurants
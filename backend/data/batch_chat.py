@@ -0,0 +1,44 @@
+"""
+Runs a JSONL file of questions through the agent in-process, the same way
+POST /chat/batch does, and writes one JSON result per line.
+
+    cd backend/data && python batch_chat.py questions.jsonl --out answers.jsonl --concurrency 16
+
+Each input line is {"query": ..., "id"?, "session_id"?, "location"?} or a
+bare JSON string. Useful for nightly cache warming and answer-quality runs.
+"""
+import os
+import sys
+import json
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from app.batch import parse_jsonl, run_batch, BATCH_CONCURRENCY
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL of questions ('-' for stdin)")
+    # Not stdout: the agent's own logging goes there.
+    parser.add_argument("--out", default="answers.jsonl", help="where to write results")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    args = parser.parse_args(argv)
+
+    text = sys.stdin.read() if args.input == "-" else open(args.input).read()
+    items = parse_jsonl(text)
+
+    from app import main as api, warmup
+    await api.startup()
+    await warmup.wait_ready()
+    try:
+        with open(args.out, "w") as out:
+            async for result in run_batch(items, args.concurrency):
+                out.write(json.dumps(result, default=str) + "\n")
+                out.flush()
+                if "summary" in result:
+                    print(f"✅ Wrote {args.out}: {json.dumps(result['summary'])}")
+    finally:
+        await api.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
@@ -1,6 +1,10 @@
 import pandas as pd
 import sqlite3
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from app.tools.catalog import Catalog
 
 def check_areas():
     print("--- INSPECTING AREAS ---")
@@ -33,15 +37,16 @@ def check_areas():
         print(f"\n📂 Found {db_path}! Querying...")
         try:
             conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT DISTINCT area FROM restaurants ORDER BY area")
-            rows = cursor.fetchall()
+            conn.row_factory = sqlite3.Row
+            # One read into the same columnar catalog the API serves from.
+            catalog = Catalog([dict(r) for r in conn.execute("SELECT name, area, cuisine, rating, cost, votes, url FROM restaurants")])
             conn.close()
+            areas = catalog.area_counts()
             
-            print(f"✅ Found {len(rows)} Unique Areas:")
+            print(f"✅ Found {len(areas)} Unique Areas ({len(catalog)} restaurants, {catalog.memory_bytes() / 1e6:.1f} MB in memory):")
             print("------------------------------------------------")
-            for row in rows:
-                print(f"'{row[0]}'")
+            for area, count in areas.items():
+                print(f"'{area}' ({count})")
             print("------------------------------------------------")
         except Exception as e:
             print(f"❌ Error reading DB: {e}")
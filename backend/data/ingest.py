@@ -1,81 +1,316 @@
 import pandas as pd
+import numpy as np
 import chromadb
 import sqlite3
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from chromadb.utils import embedding_functions
 import os
+import sys
+import json
+import time
+import argparse
+from collections import defaultdict
+from contextlib import contextmanager
 
-# --- PART 1: LOAD & CLEAN DATA ---
-print("Loading CSV...")
-# Adjust sep='|' if your file still uses pipes, otherwise sep=','
-try:
-    df = pd.read_csv("zomato.csv", sep='|') 
-except:
-    df = pd.read_csv("zomato.csv") # Fallback to comma
+# Reuse the backend's geocode cache so ingest and the API share one store.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from app.tools.geocode import address_for, backfill, cache_stats
+from app.tools.vector_search import VECTOR_INDEX_PATH, VECTOR_META_PATH
 
-# Rename for consistency
-df = df.rename(columns={
+# CONFIG
+CSV_PATH = "zomato.csv"
+DB_PATH = "restaurants.db"
+CHROMA_PATH = "./chroma_db"
+CHUNK_SIZE = 5000
+
+RENAMES = {
     "NAME": "name", "PRICE": "cost", "CUSINE_CATEGORY": "cuisine",
-    "REGION": "area", "RATING": "rating", "VOTES": "votes"
-})
-
-# Clean numeric fields for SQL
-df['cost'] = df['cost'].astype(str).str.replace(',', '').str.extract('(\d+)').astype(float).fillna(0)
-df['rating'] = pd.to_numeric(df['rating'], errors='coerce').fillna(0)
-
-# --- PART 2: CREATE SQL DATABASE (For Text-to-SQL) ---
-print("Creating SQLite DB for structured search...")
-conn = sqlite3.connect("restaurants.db")
-df.to_sql("restaurants", conn, if_exists="replace", index=False)
-conn.close()
-print("✅ SQL Database created: restaurants.db")
-
-# --- PART 3: CREATE VECTOR STORE (For RAG) ---
-print("Creating ChromaDB for Semantic Search...")
-client = chromadb.PersistentClient(path="./chroma_db")
-try:
-    client.delete_collection("restaurants")
-except:
-    pass
-collection = client.get_or_create_collection("restaurants")
-
-# Setup Recursive Splitter (The "Smart" chunking you asked for)
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=500,
-    chunk_overlap=50,
-    separators=["\n\n", "\n", ". ", " ", ""]
-)
-
-# Convert rows to text blobs
-documents = []
-metadatas = []
-ids = []
-
-for idx, row in df.iterrows():
-    # We combine important text fields for the RAG search
-    content = f"{row['name']} is a {row['cuisine']} restaurant in {row['area']}. It is known for {row['cuisine']} food."
-    
-    # Recursive split (overkill for short text, but good practice for your request)
-    chunks = text_splitter.split_text(content)
-    
-    for i, chunk in enumerate(chunks):
-        documents.append(chunk)
-        metadatas.append({
-            "name": str(row['name']),
-            "rating": float(row['rating']),
-            "cost": float(row['cost']),
-            "area": str(row['area'])
-        })
-        ids.append(f"{idx}_{i}")
-
-# Add to Chroma in batches
-batch_size = 500
-for i in range(0, len(documents), batch_size):
-    collection.add(
-        documents=documents[i:i+batch_size],
-        metadatas=metadatas[i:i+batch_size],
-        ids=ids[i:i+batch_size]
+    "REGION": "area", "RATING": "rating", "VOTES": "votes", "URL": "url"
+}
+# Fields whose change means a restaurant has to be re-written. Only a change to its
+# document (doc_hash) means it has to be re-embedded.
+CONTENT_COLUMNS = ['name', 'cuisine', 'area', 'rating', 'cost', 'votes', 'url']
+TABLE_COLUMNS = ['id'] + CONTENT_COLUMNS + ['lat', 'lng', 'content_hash', 'doc_hash']
+
+timings = defaultdict(float)
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    yield
+    timings[name] += time.perf_counter() - start
+
+# --- PART 1: LOAD & CLEAN DATA (streamed in chunks) ---
+def read_chunks(path, chunksize):
+    # Adjust sep='|' if your file still uses pipes, otherwise sep=','
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        sep = '|' if '|' in f.readline() else ','
+    yield from pd.read_csv(path, sep=sep, chunksize=chunksize)
+
+def clean(df):
+    """
+    Vectorized cleanup plus a stable id (name + area), a content hash and a
+    hash of the embedded document per row.
+    """
+    df = df.rename(columns=RENAMES)
+    for col in CONTENT_COLUMNS:
+        if col not in df.columns: df[col] = None
+    df = df[CONTENT_COLUMNS].copy()
+    for col in ('name', 'cuisine', 'area', 'url'):
+        df[col] = df[col].fillna('').astype(str).str.strip()
+    df = df[df['name'] != '']
+
+    # Clean numeric fields for SQL
+    df['cost'] = df['cost'].astype(str).str.replace(',', '').str.extract(r'(\d+)', expand=False).astype(float).fillna(0)
+    df['rating'] = pd.to_numeric(df['rating'], errors='coerce').fillna(0)
+    df['votes'] = pd.to_numeric(df['votes'], errors='coerce').fillna(0).astype(int)
+
+    df['id'] = pd.util.hash_pandas_object(df[['name', 'area']], index=False).map('{:016x}'.format)
+    df['content_hash'] = pd.util.hash_pandas_object(df[CONTENT_COLUMNS], index=False).map('{:016x}'.format)
+    # One sentence per restaurant is all RAG needs; no splitter required.
+    df['document'] = (df['name'] + " is a " + df['cuisine'] + " restaurant in " + df['area']
+                      + ". It is known for " + df['cuisine'] + " food.")
+    df['doc_hash'] = pd.util.hash_pandas_object(df['document'], index=False).map('{:016x}'.format)
+    return df.drop_duplicates('id', keep='last')
+
+# --- PART 2: SQLITE STATE ---
+def open_db(path, full):
+    conn = sqlite3.connect(path)
+    cols = [r[1] for r in conn.execute("PRAGMA table_info(restaurants)")]
+    if full or (cols and not {'id', 'content_hash'} <= set(cols)):
+        # Tables from the old from-scratch ingest have no ids/hashes to diff against.
+        conn.execute("DROP TABLE IF EXISTS restaurants")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS restaurants (
+            id TEXT PRIMARY KEY, name TEXT, cuisine TEXT, area TEXT, rating REAL, cost REAL,
+            votes INTEGER, url TEXT, lat REAL, lng REAL, content_hash TEXT, doc_hash TEXT
+        )""")
+    # Read again: a dropped table was just recreated with every column.
+    if 'doc_hash' not in [r[1] for r in conn.execute("PRAGMA table_info(restaurants)")]:
+        # Kept older tables: a NULL doc_hash re-embeds a row the next time it changes.
+        conn.execute("ALTER TABLE restaurants ADD COLUMN doc_hash TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_restaurants_area ON restaurants (area)")
+    # Leaderboards are built in memory by the API from the table it serves; nothing read this copy.
+    conn.execute("DROP TABLE IF EXISTS leaderboards")
+    # What each external sink last committed, so it's diffed against its own state.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS synced (
+            sink TEXT, id TEXT, name TEXT, area TEXT, content_hash TEXT, PRIMARY KEY (sink, id)
+        )""")
+    conn.commit()
+    return conn
+
+def load_synced(conn, sink):
+    return {r[0]: (r[1], r[2], r[3]) for r in conn.execute("SELECT id, content_hash, name, area FROM synced WHERE sink = ?", (sink,))}
+
+def record_synced(conn, sink, pushed, deleted):
+    """
+    Called only after the sink committed; a failed push leaves the old state to diff against.
+    """
+    conn.executemany("DELETE FROM synced WHERE sink = ? AND id = ?", [(sink, rid) for rid in deleted])
+    conn.executemany("INSERT OR REPLACE INTO synced VALUES (?, ?, ?, ?, ?)",
+                     [(sink, *row) for rows in pushed for row in rows.itertuples(index=False, name=None)])
+    conn.commit()
+
+def upsert_sqlite(conn, rows):
+    placeholders = ", ".join("?" for _ in TABLE_COLUMNS)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO restaurants ({', '.join(TABLE_COLUMNS)}) VALUES ({placeholders})",
+        rows[TABLE_COLUMNS].astype(object).where(rows[TABLE_COLUMNS].notna(), None).itertuples(index=False, name=None)
     )
-    print(f"Chroma Batch {i} done...")
 
-print("✅ RAG Vector Store created: ./chroma_db")
\ No newline at end of file
+# --- PART 3: RUNTIME VECTOR MATRIX ---
+META_KEYS = ("id", "name", "area", "cuisine", "rating", "cost")
+
+def load_matrix():
+    if not (os.path.exists(VECTOR_INDEX_PATH) and os.path.exists(VECTOR_META_PATH)): return None, None
+    with open(VECTOR_META_PATH) as f:
+        meta = json.load(f)
+    if "id" not in meta: return None, None
+    return np.load(VECTOR_INDEX_PATH), meta
+
+def save_matrix(matrix, meta, new_vectors, new_meta, deleted):
+    """
+    Patches the previous matrix in place: re-embedded rows overwritten,
+    new rows appended, deleted rows dropped. Rows in new_meta without a
+    new vector only get their metadata (rating, cost...) updated.
+    """
+    ids = meta["id"] if meta else []
+    pos = {rid: i for i, rid in enumerate(ids)}
+    rows = [] if matrix is None else list(matrix)
+    meta = {k: list(meta[k]) for k in META_KEYS} if meta else {k: [] for k in META_KEYS}
+    for rid, m in new_meta.items():
+        if rid in pos:
+            if rid in new_vectors: rows[pos[rid]] = new_vectors[rid]
+            for k in META_KEYS: meta[k][pos[rid]] = m[k]
+        else:
+            pos[rid] = len(rows)
+            rows.append(new_vectors[rid])
+            for k in META_KEYS: meta[k].append(m[k])
+    keep = [i for i, rid in enumerate(meta["id"]) if rid not in deleted]
+    out = np.asarray([rows[i] for i in keep], dtype=np.float32)
+    if len(out):
+        out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+    np.save(VECTOR_INDEX_PATH, out)
+    with open(VECTOR_META_PATH, "w") as f:
+        json.dump({k: [meta[k][i] for i in keep] for k in META_KEYS}, f)
+    return out.shape
+
+# --- PART 4: POSTGRES (optional, bulk COPY) ---
+class PostgresSink:
+    """
+    Streams changed rows into a temp staging table with COPY, then swaps them
+    into restaurants in one transaction, matching rows on (name, area).
+    """
+    COLUMNS = CONTENT_COLUMNS + ['lat', 'lng']
+
+    def __init__(self, url):
+        import psycopg
+        self.conn = psycopg.connect(url)
+        cols = ", ".join(f"{c} {t}" for c, t in zip(self.COLUMNS, ["text", "text", "text", "real", "real", "integer", "text", "real", "real"]))
+        self.conn.execute(f"CREATE TEMP TABLE staging ({cols})")
+        self.conn.execute("CREATE TEMP TABLE removed (name text, area text)")
+        for col, kind in (("lat", "double precision"), ("lng", "double precision")):
+            self.conn.execute(f"ALTER TABLE restaurants ADD COLUMN IF NOT EXISTS {col} {kind}")
+
+    def write(self, rows):
+        with self.conn.cursor() as cur:
+            with cur.copy(f"COPY staging ({', '.join(self.COLUMNS)}) FROM STDIN") as copy:
+                for row in rows[self.COLUMNS].astype(object).where(rows[self.COLUMNS].notna(), None).itertuples(index=False, name=None):
+                    copy.write_row(row)
+
+    def delete(self, keys):
+        with self.conn.cursor() as cur:
+            with cur.copy("COPY removed (name, area) FROM STDIN") as copy:
+                for key in keys: copy.write_row(key)
+
+    def commit(self):
+        cols = ", ".join(self.COLUMNS)
+        self.conn.execute("DELETE FROM restaurants r USING staging s WHERE r.name = s.name AND r.area = s.area")
+        self.conn.execute("DELETE FROM restaurants r USING removed d WHERE r.name = d.name AND r.area = d.area")
+        self.conn.execute(f"INSERT INTO restaurants ({cols}) SELECT {cols} FROM staging")
+        self.conn.commit()
+        self.conn.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incremental restaurant ingest: SQLite, Chroma, vector matrix, geocodes.")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--full", action="store_true", help="ignore previous state and rebuild everything")
+    parser.add_argument("--postgres", action="store_true", help="also push changes to SUPABASE_URL with COPY")
+    args = parser.parse_args(argv)
+    total_start = time.perf_counter()
+
+    matrix, meta = load_matrix()
+    # Without the previous vectors every row has to be embedded anyway.
+    full = args.full or matrix is None
+    conn = open_db(DB_PATH, full)
+    existing = dict(conn.execute("SELECT id, content_hash FROM restaurants"))
+    existing_docs = dict(conn.execute("SELECT id, doc_hash FROM restaurants"))
+    # A row missing from the matrix needs a vector even if its document didn't change.
+    in_matrix = set(meta["id"]) if meta and not full else set()
+    keys_by_id = dict(((r[0], (r[1], r[2])) for r in conn.execute("SELECT id, name, area FROM restaurants")))
+
+    client = chromadb.PersistentClient(path=CHROMA_PATH)
+    if full:
+        try:
+            client.delete_collection("restaurants")
+        except:
+            pass
+    collection = client.get_or_create_collection("restaurants")
+    embed_fn = embedding_functions.DefaultEmbeddingFunction()
+    sink = PostgresSink(os.environ["SUPABASE_URL"]) if args.postgres else None
+    # Empty the first time: every row is pushed. --full pushes everything too.
+    synced = {rid: h for rid, (h, _, _) in load_synced(conn, "postgres").items()} if sink else {}
+    pushed = []
+
+    counts = defaultdict(int)
+    seen = set()
+    new_vectors, new_meta = {}, {}
+    print(f"Loading {args.csv} in chunks of {args.chunksize} ({'full rebuild' if full else 'incremental'})...")
+    for chunk in read_chunks(args.csv, args.chunksize):
+        with stage("clean"):
+            df = clean(chunk)
+            df = df[~df['id'].isin(seen)]
+            seen.update(df['id'])
+        with stage("diff"):
+            old_hash = df['id'].map(existing)
+            status = np.where(old_hash.isna(), "added", np.where(old_hash == df['content_hash'], "unchanged", "changed"))
+            for s, n in zip(*np.unique(status, return_counts=True)): counts[s] += int(n)
+            stale = status != "unchanged"
+            if sink:
+                # Postgres is diffed against what it last committed, not against SQLite.
+                stale_pg = np.full(len(df), full) | (df['id'].map(synced) != df['content_hash']).to_numpy()
+                todo = df[stale | stale_pg].copy()
+            else:
+                todo = df[stale].copy()
+        if todo.empty: continue
+
+        # Fills the geocode cache so lookups at request time never hit Google.
+        with stage("geocode"):
+            addresses = [address_for(n, a) for n, a in zip(todo['name'], todo['area'])]
+            coords = backfill(addresses)
+            todo['lat'] = [(coords[a] or {}).get('lat') for a in addresses]
+            todo['lng'] = [(coords[a] or {}).get('lng') for a in addresses]
+        if sink:
+            with stage("postgres"):
+                sink.write(todo)
+                pushed.append(todo[['id', 'name', 'area', 'content_hash']])
+        dirty = todo[todo['id'].isin(df['id'][stale])]
+        if dirty.empty: continue
+        with stage("sqlite"):
+            upsert_sqlite(conn, dirty)
+            conn.commit()
+        # A ratings/cost/votes refresh changes the row but not the text that was embedded.
+        reembed = dirty[(dirty['id'].map(existing_docs) != dirty['doc_hash']) | ~dirty['id'].isin(in_matrix)]
+        retag = dirty[~dirty['id'].isin(reembed['id'])]
+        counts["re-embedded"] += len(reembed)
+        with stage("embed"):
+            docs = reembed['document'].tolist()
+            vectors = np.asarray(embed_fn(docs), dtype=np.float32) if docs else np.empty((0, 0), dtype=np.float32)
+        with stage("chroma"):
+            metadatas = reembed[['name', 'rating', 'cost', 'area', 'cuisine']].to_dict('records')
+            for i in range(0, len(reembed), 500):
+                collection.upsert(ids=reembed['id'].iloc[i:i+500].tolist(), documents=docs[i:i+500],
+                                  embeddings=vectors[i:i+500].tolist(), metadatas=metadatas[i:i+500])
+            metadatas = retag[['name', 'rating', 'cost', 'area', 'cuisine']].to_dict('records')
+            for i in range(0, len(retag), 500):
+                collection.update(ids=retag['id'].iloc[i:i+500].tolist(), metadatas=metadatas[i:i+500])
+        for rid, vec in zip(reembed['id'], vectors):
+            new_vectors[rid] = vec
+        for rid, m in zip(dirty['id'], dirty[list(META_KEYS)].to_dict('records')):
+            new_meta[rid] = m
+        print(f"Chunk done: {len(df)} rows, {len(dirty)} written, {len(reembed)} re-embedded...")
+
+    deleted = set(existing) - seen
+    counts["deleted"] = len(deleted)
+    if deleted:
+        with stage("sqlite"):
+            conn.executemany("DELETE FROM restaurants WHERE id = ?", [(rid,) for rid in deleted])
+            conn.commit()
+        with stage("chroma"):
+            collection.delete(ids=list(deleted))
+
+    changed = counts["added"] + counts["changed"] + counts["deleted"]
+    if changed:
+        with stage("matrix"):
+            shape = save_matrix(None if full else matrix, None if full else meta, new_vectors, new_meta, deleted)
+        print(f"✅ Vector matrix saved: {VECTOR_INDEX_PATH} {shape}")
+    if sink:
+        with stage("postgres"):
+            pg_synced = load_synced(conn, "postgres")
+            pg_deleted = (set(pg_synced) | deleted) - seen
+            keys = {rid: (pg_synced[rid][1], pg_synced[rid][2]) if rid in pg_synced else keys_by_id[rid] for rid in pg_deleted}
+            sink.delete(keys.values())
+            sink.commit()
+            record_synced(conn, "postgres", pushed, pg_deleted)
+        print(f"✅ Postgres synced: {sum(len(p) for p in pushed)} rows pushed, {len(pg_deleted)} deleted")
+    conn.close()
+
+    print(f"✅ Ingest done in {time.perf_counter() - total_start:.1f}s: "
+          f"{counts['added']} added, {counts['changed']} changed, {counts['unchanged']} unchanged, {counts['deleted']} deleted, "
+          f"{counts['re-embedded']} re-embedded")
+    print("Stage timings: " + ", ".join(f"{k} {v:.2f}s" for k, v in timings.items()))
+    print(f"Geocode cache: {cache_stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -34,6 +34,15 @@ const extractYoutubeIds = (ytData: any): string[] => {
   return Array.from(ids);
 };
 
+// One conversation per browser tab.
+const SESSION_ID = (() => {
+  const existing = sessionStorage.getItem('munchy-session-id');
+  if (existing) return existing;
+  const id = crypto.randomUUID();
+  sessionStorage.setItem('munchy-session-id', id);
+  return id;
+})();
+
 // --- TYPES ---
 export interface Message {
   id: string;
@@ -105,8 +114,7 @@ export function ChatInterface({ onNewMessage }: ChatInterfaceProps) {
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ 
           query: userMessage.content, 
-          session_id: 'user-session-v1',
-          chat_history: messages.slice(-5).map(m => ({ role: m.role, content: m.content })) // Send History!
+          session_id: SESSION_ID, // History lives server-side under this id
         }),
       });
 